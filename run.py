@@ -1,12 +1,18 @@
 """Main entry point for price estimation."""
 from argparse import ArgumentParser
-from asyncio import run
-from datetime import datetime, timedelta
+from asyncio import Semaphore, gather, run
+from datetime import date, datetime, timedelta
 from time import time
+from typing import Dict, List
+
+try:
+    import uvloop
+except ImportError:
+    # uvloop is optional and isn't available on Windows
+    uvloop = None
 
 from src.config import BitcoinConfig
 from src.daily_price import BitcoinDailyPrice
-from src.helpers import format_date, is_valid_date
 from src.logger import init_logger
 from src.rpc import BitcoinRPCClient
 
@@ -38,9 +44,6 @@ async def main():
 
     The resulting price estimates are logged.
 
-    TODO: Due to limitations in node capacity for handling requests, parallel
-    execution for multiple dates is temporarily disabled.
-
     :raises: Exception if an invalid date format is provided.
     """
     parser = ArgumentParser()
@@ -59,54 +62,120 @@ async def main():
     # Parse the command-line arguments
     args = parser.parse_args()
 
-    # if only want a single date
-    if args.date:
-        if is_valid_date(args.date):
-            logger.info("Price estimate date set: %s", args.date)
-            date_index = [args.date]
-        else:
-            logger.error("Please provide date in the format YYYY-MM-DD.")
+    try:
+        # if only want a single date
+        if args.date:
+            date_index = [parse_date(args.date).isoformat()]
+            logger.info("Price estimate date set: %s", date_index[0])
 
-    # Check if the flag was provided for range of dates
-    elif args.start and args.end:
-        if is_valid_date(args.start) and is_valid_date(args.end):
-            start = format_date(args.start)
-            end = format_date(args.end)
+        # Check if the flag was provided for range of dates
+        elif args.start and args.end:
+            start = parse_date(args.start)
+            end = parse_date(args.end)
 
-            logger.info("Price estimate dates set: %s to %s", args.start, args.end)
+            logger.info("Price estimate dates set: %s to %s", start, end)
 
             # Generate a list of dates between start and end (inclusive)
             date_index = [
-                (start + timedelta(days=x)).strftime("%Y-%m-%d")
+                (start + timedelta(days=x)).isoformat()
                 for x in range((end - start).days + 1)
             ]
-
         else:
-            logger.error("Please provide dates in the format YYYY-MM-DD.")
-    else:
-        logger.info("No dates provided. Getting prior day...")
-        date_index = [(datetime.today() - timedelta(days=1)).strftime("%Y-%m-%d")]
+            logger.info("No dates provided. Getting prior day...")
+            date_index = [(datetime.today() - timedelta(days=1)).strftime("%Y-%m-%d")]
+    except ValueError:
+        logger.error("Please provide dates in the format YYYY-MM-DD.")
+        return
 
     config = BitcoinConfig()
     async with BitcoinRPCClient(config) as rpc:
-        for date in date_index:
-            await BitcoinDailyPrice(rpc, date).run_estimate_price()
-
-        # TODO: node can't handle too many requests at once.
-        # should figure out way to get around this limitation.
-        """await gather(
-            *[
-                create_task(BitcoinDailyPrice(rpc, date).run_estimate_price())
-                for date in date_index
-            ]
-        )"""
-        
-               
-if __name__ == "__main__":
+        await estimate_prices(rpc, date_index, config.max_concurrency)
+
+
+def parse_date(date_string: str) -> date:
+    """
+    Parse a date given as YYYY-MM-DD.
+
+    Unlike datetime.fromisoformat, times, UTC offsets and compact forms
+    are rejected, so every price day starts at UTC midnight.
+
+    :param date_string: The date in the format YYYY-MM-DD.
+    :type date_string: str
+    :return: The parsed date.
+    :rtype: date
+
+    :raises ValueError: If date_string isn't in the format YYYY-MM-DD.
+    """
+    return datetime.strptime(date_string, "%Y-%m-%d").date()
+
+
+async def estimate_prices(
+    rpc: BitcoinRPCClient, date_index: List[str], max_concurrency: int
+) -> List[int]:
+    """
+    Estimate Bitcoin prices for a list of dates.
+
+    Each day first finds its price day block, with at most max_concurrency
+    days running at once so the node isn't flooded with requests. The blocks
+    needed by all days are then retrieved together instead of once per day,
+    and each block is added to every day that needs it as it arrives, so
+    only the blocks in flight are held in memory. Overlapping heights of
+    neighboring days are only retrieved once.
+
+    :param rpc: Bitcoin RPC client
+    :type rpc: BitcoinRPCClient
+    :param date_index: Dates to estimate in the format YYYY-MM-DD.
+    :type date_index: List[str]
+    :param max_concurrency: Maximum number of days prepared at once.
+    :type max_concurrency: int
+    :return: Estimated BTC prices in USD, in the order of date_index.
+    :rtype: List[int]
+    """
+    daily_prices = [BitcoinDailyPrice(rpc, date) for date in date_index]
+
+    semaphore = Semaphore(max_concurrency)
+
+    async def bounded_prepare(daily_price: BitcoinDailyPrice) -> List[int]:
+        async with semaphore:
+            return await daily_price.prepare()
+
+    daily_block_heights = await gather(
+        *[bounded_prepare(daily_price) for daily_price in daily_prices]
+    )
+
+    # days needing each block height
+    height_days: Dict[int, List[BitcoinDailyPrice]] = {}
+    for daily_price, heights in zip(daily_prices, daily_block_heights):
+        for height in heights:
+            height_days.setdefault(height, []).append(daily_price)
+
+    block_hashes = await rpc.get_block_hashes(sorted(height_days))
+    async for block in rpc.iter_blocks(block_hashes):
+        for daily_price in height_days[block.height]:
+            daily_price.add_block(block)
+
+    return [daily_price.finalize() for daily_price in daily_prices]
+
+
+def main_sync():
+    """
+    Run main to completion from synchronous code.
+
+    This is the single command-line entry point, also usable as a
+    console-script target. The event loop is uvloop's if it is installed,
+    which dispatches the RPC sockets faster than asyncio's default loop.
+    """
     start_time = time()
 
-    run(main())
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        run(main())
 
     print(
         f"Execution Time For Data Collection: {str(time() - start_time)} seconds!",
     )
+
+
+if __name__ == "__main__":
+    main_sync()
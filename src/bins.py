@@ -1,14 +1,46 @@
 """Class for working with price bins."""
-from itertools import chain
-from math import log10
-from typing import Dict, List
+import numpy as np
 
-from src.helpers import get_day_of_month
+from src.blocks import Block
 from src.logger import init_logger
 from src.rpc import BitcoinRPCClient
 
 logger = init_logger("bitcoin_price_oracle")
 
+SECONDS_IN_DAY = 86400
+
+
+def _generate_bin_values(
+    first_bin_value: int, last_bin_value: int, num_bins_per_10x: int
+) -> np.ndarray:
+    """
+    Generate an array of bin values.
+
+    This function generates bin values that follow a logarithmic scale based
+    on the provided number of bins per 10x range. It calculates values
+    spanning from the first to the last bin value, with a specified number
+    of bins per 10x.
+
+    :param first_bin_value: The power of ten of the first bin.
+    :type first_bin_value: int
+    :param last_bin_value: The power of ten the bins stop before.
+    :type last_bin_value: int
+    :param num_bins_per_10x: The number of bins per 10x range.
+    :type num_bins_per_10x: int
+
+    :return: A read-only array of bin values following a logarithmic scale.
+    :rtype: np.ndarray
+    """
+    bin_values = [
+        10 ** (exponent + b / num_bins_per_10x)
+        for exponent in range(first_bin_value, last_bin_value)
+        for b in range(num_bins_per_10x)
+    ]
+    # Add zero sats as the first bin
+    bin_values = np.array([0.0] + bin_values, dtype=np.float64)
+    bin_values.setflags(write=False)
+    return bin_values
+
 
 class PriceBins:
     """PriceBins class for organizing price bins and related calculations."""
@@ -17,188 +49,149 @@ class PriceBins:
     first_bin_value: int = -6
     last_bin_value: int = 6
     range_bin_values: int = last_bin_value - first_bin_value
+    num_bins_per_10x: int = 200
+
+    # bin values are the same for every day, so they are generated once
+    output_bell_curve_bins: np.ndarray = _generate_bin_values(
+        first_bin_value, last_bin_value, num_bins_per_10x
+    )
+    number_of_bins: int = len(output_bell_curve_bins)
 
     # set bounds for curve
     lower_bound: int = 201
     upper_bound: int = 1601
 
-    # create a list of round btc bin numbers
-    round_btc_bins: List[int] = [
-        201,  # 1k sats
-        401,  # 10k
-        461,  # 20k
-        496,  # 30k
-        540,  # 50k
-        601,  # 100k
-        661,  # 200k
-        696,  # 300k
-        740,  # 500k
-        801,  # 0.01 btc
-        861,  # 0.02
-        896,  # 0.03
-        940,  # 0.04
-        1001,  # 0.1
-        1061,  # 0.2
-        1096,  # 0.3
-        1140,  # 0.5
-        1201,  # 1 btc
-    ]
-
-    def __init__(self, rpc: BitcoinRPCClient, price_day_block: int):
+    # create an array of round btc bin numbers
+    round_btc_bins: np.ndarray = np.array(
+        [
+            201,  # 1k sats
+            401,  # 10k
+            461,  # 20k
+            496,  # 30k
+            540,  # 50k
+            601,  # 100k
+            661,  # 200k
+            696,  # 300k
+            740,  # 500k
+            801,  # 0.01 btc
+            861,  # 0.02
+            896,  # 0.03
+            940,  # 0.04
+            1001,  # 0.1
+            1061,  # 0.2
+            1096,  # 0.3
+            1140,  # 0.5
+            1201,  # 1 btc
+        ],
+        dtype=np.intp,
+    )
+
+    def __init__(
+        self, rpc: BitcoinRPCClient, price_day_block: int, price_day_timestamp: int
+    ):
         """
         Initialize the PriceBins object.
 
         :param price_day_block: The first block on day to get price estimate.
-        :type pass_values: int
+        :type price_day_block: int
+        :param price_day_timestamp: The timestamp of the start of the price day.
+        :type price_day_timestamp: int
         """
         # inherit from BitcoinDailyPrice
         self.rpc = rpc
         self.price_day_block = price_day_block
 
-        logger.info("Generating bins...")
+        # utc day number of the price day, blocks from other days are skipped
+        self.price_day = price_day_timestamp // SECONDS_IN_DAY
+
+        logger.debug("Generating bins...")
 
-        # Generate bin values and initialize bin counts
-        self.output_bell_curve_bins = self._generate_bin_values()
-        self.output_bell_curve_bin_counts = self._initialize_bin_counts(
-            self.output_bell_curve_bins
+        # initialize bin counts. Counts are float32 to halve the memory
+        # traffic of the curve passes, bin values stay float64 so amounts
+        # are searched at full precision
+        self.output_bell_curve_bin_counts = np.zeros(
+            self.number_of_bins, dtype=np.float32
+        )
+
+        # Gets 25 blocks before and 175 blocks after price_day_block set by
+        # oscillator to make sure all blocks on that day are retrieved and
+        # parsed for vout amounts. Average is 144 blocks per day.
+        self.block_heights = list(
+            range(self.price_day_block - 25, self.price_day_block + 175, 1)
         )
-        self.number_of_bins = len(self.output_bell_curve_bins)
 
     async def run_price_bins(self):
-        """Run the price bin calculations."""
-        await self._get_target_day_blocks()
-        self._remove_outlier_amounts()
-        self._smooth_round_btc_bins()
-        self._normalize_curve()
+        """Retrieve the blocks for the price day and run the price bin calculations."""
+        block_hashes = await self.rpc.get_block_hashes(self.block_heights)
+        async for block in self.rpc.iter_blocks(block_hashes):
+            self.add_block(block)
+        self.process_curve()
 
-    def _generate_bin_values(self, num_bins_per_10x: int = 200) -> List[float]:
+    def add_block(self, block: Block) -> None:
         """
-        Generate a list of bin values.
-
-        This method generates a list of bin values that follow a logarithmic
-        scale based on the provided number of bins per 10x range. It
-        calculates values spanning from the first to the last bin value,
-        with a specified number of bins per 10x.
+        Count the outputs of a block if it is on the price day.
 
-        :param num_bins_per_10x: The number of bins per 10x range.
-        :type num_bins_per_10x: int, optional
+        Blocks can be added in any order as they are retrieved, so they
+        don't all need to be held in memory.
 
-        :return: A list of bin values following a logarithmic scale.
-        :rtype: List[float]
+        :param block: A block at one of block_heights with verbose transactions.
+        :type block: Block
         """
-        bin_values = [
-            10 ** (exponent + b / num_bins_per_10x)
-            for exponent in range(self.first_bin_value, self.last_bin_value)
-            for b in range(num_bins_per_10x)
-        ]
-        return [0.0] + bin_values  # Add zero sats as the first bin
-
-    def _initialize_bin_counts(self, bin_values: List[float]) -> float:
-        """
-        Initialize bin counts to zero for each bin value.
-
-        This method takes a list of bin values and initializes the bin
-        counts for each bin value to zero. The resulting list contains
-        zero counts corresponding to each bin value.
+        if block.time // SECONDS_IN_DAY == self.price_day:
+            self._bin_block(block)
 
-        :param bin_values: List of bin values.
-        :type bin_values: List[float]
-
-        :return: A list of zero counts corresponding to each bin value.
-        :rtype: List[float]
-        """
-        return [0.0] * len(bin_values)
+    def process_curve(self) -> None:
+        """Run the price bin calculations once all blocks have been added."""
+        self._remove_outlier_amounts()
+        self._smooth_round_btc_bins()
+        self._normalize_curve()
 
-    async def _get_target_day_blocks(self) -> None:
+    def _bin_block(self, block: Block) -> None:
         """
-        Retrieve and process blocks from a specified day.
+        Count the outputs of one block into their price bins.
 
-        This function retrieves blocks for a given day centered around the
-        price_day_block set by oscillator, parses the outputs, and processes
-        them for further analysis.
+        Binning block by block keeps the amounts array the size of one
+        block rather than of a whole day.
 
-        Note:
-            Gets 25 blocks before and 175 blocks after price_day_block
-            set by oscillator to make sure all blocks on that day are
-            retrieved and parsed for vout amounts. Average is 144 blocks
-            per day.
+        :param block: A block with verbose transactions.
+        :type block: Block
         """
-        blocks_heights = list(
-            range(self.price_day_block - 25, self.price_day_block + 175, 1)
+        amounts = np.fromiter(
+            (output.value for tx in block.tx for output in tx.vout),
+            dtype=np.float64,
         )
+        self._bin_amounts(amounts)
 
-        block_hashes = await self.rpc.get_block_hashes(blocks_heights)
-
-        block_responses = await self.rpc.get_blocks(block_hashes)
-
-        target_day_of_month = get_day_of_month(block_responses[50]["time"])
-
-        # filters to only blocks on day of price_day_block target
-        block_responses = [
-            block
-            for block in block_responses
-            if get_day_of_month(block["time"]) == target_day_of_month
-        ]
-
-        for vout in chain.from_iterable(
-            (output for tx in block["tx"] for output in tx["vout"])
-            for block in block_responses
-        ):
-            self._parse_outputs(vout)
-
-    def _parse_outputs(self, vout: Dict) -> None:
+    def _bin_amounts(self, amounts: np.ndarray) -> None:
         """
-        Parse and process a transaction output to update bin counts.
+        Count output amounts into their price bins.
 
-        This method extracts the amount from a transaction output and calculates the
-        corresponding bin number. It then increments the bin count for that bin number
-        in the output bin counts.
+        Amounts are binned in a single vectorized pass. Each amount falls in
+        the last bin whose value is less than or equal to it. Since the bin
+        values are evenly spaced powers of ten, that bin is computed directly
+        from the log of the amount instead of searching for it.
 
-        :param vout: The output of a transaction.
-        :type vout: Dict
+        :param amounts: The output amounts in btc.
+        :type amounts: np.ndarray
         """
-        amount = float(vout["value"])
-
         # tiny and huge amounts aren't used by the USD price finder
-        if 1e-6 < amount < 1e6:
-            # take the log
-            amount_log = log10(amount)
-
-            # find the right output amount bin to increment
-            bin_number_est = self._calculate_bin_number_est(amount_log)
-
-            # search for the exact right bin (won't be less than)
-            while self.output_bell_curve_bins[bin_number_est] <= amount:
-                bin_number_est += 1
-            bin_number = bin_number_est - 1
-
-            # increment the output bin
-            self._increment_bin_count(bin_number)
+        amounts = amounts[(1e-6 < amounts) & (amounts < 1e6)]
 
-    def _calculate_bin_number_est(self, amount_log: float) -> int:
-        """
-        Calculate the estimated bin number based on the log of the amount.
-
-        :param amount_log: The logarithm of the amount.
-        :type amount_log: float
-
-        :return: The estimated bin number.
-        :rtype: int
-        """
-        bin_percentage = (amount_log - self.first_bin_value) / self.range_bin_values
-        return int(bin_percentage * self.number_of_bins)
-
-    def _increment_bin_count(self, bin_number: int) -> None:
-        """
-        Increment the count of a specific bin.
+        # bin 0 is zero sats, so the log bins start at 1
+        bin_numbers = np.floor(
+            (np.log10(amounts) - self.first_bin_value) * self.num_bins_per_10x
+        ).astype(np.intp)
+        bin_numbers += 1
+        np.clip(bin_numbers, 1, self.number_of_bins - 2, out=bin_numbers)
 
-        This method increments the count of the specified bin in
-        the output bin counts.
+        # rounding in log10 can land an amount one bin off from an exact bin
+        # value, so compare against the neighboring bin values to be exact
+        bin_numbers -= self.output_bell_curve_bins[bin_numbers] > amounts
+        bin_numbers += self.output_bell_curve_bins[bin_numbers + 1] <= amounts
 
-        :param bin_number: The bin number to increment.
-        :type bin_number: int
-        """
-        self.output_bell_curve_bin_counts[bin_number] += 1.0
+        self.output_bell_curve_bin_counts += np.bincount(
+            bin_numbers, minlength=self.number_of_bins
+        ).astype(np.float32)
 
     def _remove_outlier_amounts(self) -> None:
         """
@@ -209,11 +202,9 @@ class PriceBins:
         upper (10.0 btc) bounds.
         """
         # remove ouputs below 1k sats
-        self.output_bell_curve_bin_counts[: self.lower_bound] = [0.0] * self.lower_bound
+        self.output_bell_curve_bin_counts[: self.lower_bound] = 0.0
         # remove outputs above ten btc
-        self.output_bell_curve_bin_counts[self.upper_bound :] = [0.0] * (
-            self.number_of_bins - self.upper_bound
-        )
+        self.output_bell_curve_bin_counts[self.upper_bound :] = 0.0
 
     def _smooth_round_btc_bins(self) -> None:
         """
@@ -222,20 +213,28 @@ class PriceBins:
         This method smoothes the output bell curve by averaging the bin
         counts for round BTC amounts.
         """
-        for r in self.round_btc_bins:
-            amount_above = self.output_bell_curve_bin_counts[r + 1]
-            amount_below = self.output_bell_curve_bin_counts[r - 1]
-            self.output_bell_curve_bin_counts[r] = 0.5 * (amount_above + amount_below)
+        # no round bin is next to another, so smoothing them all at once
+        # gives the same result as smoothing them one at a time
+        counts = self.output_bell_curve_bin_counts
+        counts[self.round_btc_bins] = 0.5 * (
+            counts[self.round_btc_bins + 1] + counts[self.round_btc_bins - 1]
+        )
 
-    def _set_curve_sum(self) -> None:
+    def _set_curve_sum(self) -> float:
         """
-        Set the sum of the curve for normalization.
+        Get the sum of the curve for normalization.
+
+        This method calculates the sum of the curve within
+        the specified range for normalization.
 
-        This method calculates and sets the sum of the
-        curve within the specified range for normalization.
+        :return: The sum of the bin counts between the bounds.
+        :rtype: float
         """
-        return sum(
-            self.output_bell_curve_bin_counts[self.lower_bound : self.upper_bound]
+        # accumulate in float64 so large daily totals stay exact
+        return float(
+            self.output_bell_curve_bin_counts[self.lower_bound : self.upper_bound].sum(
+                dtype=np.float64
+            )
         )
 
     def _normalize_curve(self) -> None:
@@ -245,9 +244,7 @@ class PriceBins:
         This method normalizes the output bell curve by dividing each
         count by the curve's sum and removes extreme values.
         """
-        self.output_bell_curve_bin_counts[self.lower_bound : self.upper_bound] = [
-            min(0.008, count / self._set_curve_sum())
-            for count in self.output_bell_curve_bin_counts[
-                self.lower_bound : self.upper_bound
-            ]
-        ]
+        curve = self.output_bell_curve_bin_counts[self.lower_bound : self.upper_bound]
+        # curve is a view, so both steps update the bin counts in place
+        np.divide(curve, self._set_curve_sum(), out=curve)
+        np.minimum(curve, 0.008, out=curve)
@@ -0,0 +1,49 @@
+"""Typed results of Bitcoin Core block RPC calls."""
+from typing import List, Optional
+
+import msgspec
+
+
+class TxOut(msgspec.Struct):
+    """A transaction output of a verbose block."""
+
+    value: float
+
+
+class Transaction(msgspec.Struct):
+    """
+    A transaction of a verbose block.
+
+    Only the outputs are decoded. Inputs, scripts and hex, most of each
+    getblock response, are skipped without being turned into objects.
+    """
+
+    vout: List[TxOut]
+
+
+class Block(msgspec.Struct):
+    """A block from getblock with verbosity 2, with the fields used for prices."""
+
+    hash: str
+    height: int
+    time: int
+    tx: List[Transaction]
+
+
+class BlockHeader(msgspec.Struct):
+    """A block header from getblockheader."""
+
+    hash: str
+    confirmations: int
+    height: int
+    version: int
+    merkleroot: str
+    time: int
+    mediantime: int
+    nonce: int
+    bits: str
+    difficulty: float
+    chainwork: str
+    n_tx: int = msgspec.field(name="nTx")
+    previousblockhash: Optional[str] = None
+    nextblockhash: Optional[str] = None
@@ -1,8 +1,7 @@
 """BitcoinConfig Class."""
-import re
 from os import getenv, path
 from pathlib import Path
-from typing import List
+from typing import Dict, List
 
 from src.exceptions import BitcoinConfigException
 from src.logger import init_logger
@@ -16,17 +15,45 @@ class BitcoinConfig:
 
     This class parses the bitcoin.conf file and extracts relevant RPC-related
     configuration options. It generates the appropriate options to be used
-    with bitcoin-cli commands.
+    with bitcoin-cli commands and the connection settings for the JSON-RPC
+    HTTP client.
     """
 
-    def __init__(self, conf_path: str = None):
+    # defaults used when bitcoin.conf doesn't set them
+    default_rpc_host: str = "127.0.0.1"
+    default_rpc_port: str = "8332"
+
+    # connection limits for the RPC client's keep-alive HTTP session.
+    # max_connections is default_max_connections unless set with the
+    # rpc_pool_size environment variable
+    default_max_connections: int = 8
+    keepalive_timeout: int = 300
+    rpc_timeout: int = 300
+
+    # most calls in one JSON-RPC batch request. Larger batches make the
+    # node buffer every response of the batch before sending any, which is
+    # why only getblockhash lookups are batched and blocks never are
+    rpc_batch_size: int = 100
+
+    def __init__(
+        self, conf_path: str = None, max_concurrency: int = 4, rpc_batch: bool = True
+    ):
         """
         Initialize the BitcoinConfig instance.
 
         :param conf_path: The path where the bitcoin.conf file is located
             (default is None - "~/.bitcoin/bitcoin.conf").
         :type conf_path: str
+        :param max_concurrency: The maximum number of days estimated
+            concurrently against the node (default is 4).
+        :type max_concurrency: int
+        :param rpc_batch: Send getblockhash lookups as JSON-RPC batches,
+            or as parallel calls if False for nodes slow to buffer large
+            batches (default is True).
+        :type rpc_batch: bool
         """
+        self.max_concurrency = max_concurrency
+        self.rpc_batch = rpc_batch
         if not conf_path:
             self.conf_path = Path.home() / ".bitcoin/bitcoin.conf"
         else:
@@ -35,7 +62,7 @@ class BitcoinConfig:
             "datadir",
             "rpcuser",
             "rpcpassword",
-            "rpcookiefile",
+            "rpccookiefile",
             "rpcconnect",
             "rpcport",
             "conf",
@@ -43,6 +70,33 @@ class BitcoinConfig:
 
         self.config = {}
 
+        # options are parsed once and cached by generate_options
+        self._options = None
+
+    @property
+    def max_connections(self) -> int:
+        """
+        Get the number of connections the RPC client keeps open.
+
+        This is best kept at or below the node's rpcthreads.
+
+        :return: rpc_pool_size from the environment if set, otherwise
+            default_max_connections.
+        :rtype: int
+
+        :raises BitcoinConfigException: If rpc_pool_size isn't a positive
+            integer.
+        """
+        pool_size = getenv("rpc_pool_size")
+        if pool_size is None:
+            return self.default_max_connections
+
+        if not pool_size.isdigit() or int(pool_size) < 1:
+            raise BitcoinConfigException(
+                f"rpc_pool_size must be a positive integer, not {pool_size!r}..."
+            )
+        return int(pool_size)
+
     def generate_options(self) -> List[str]:
         """
         Generate RPC-related options for bitcoin-cli commands.
@@ -58,6 +112,9 @@ class BitcoinConfig:
             >>> rpc_options = config.generate_options()
             >>> print(rpc_options)
         """
+        if self._options is not None:
+            return list(self._options)
+
         options = []
 
         if path.exists(self.conf_path):
@@ -65,15 +122,15 @@ class BitcoinConfig:
                 # Read the file and parse key-value pairs
                 with open(self.conf_path, "r", encoding="utf-8") as file:
                     for line in file:
-                        line = line.strip()
-                        if not line or line.startswith("#"):
-                            continue  # Skip empty lines and comments
-
-                        # Use regular expression to extract key-value pairs
-                        match = re.match(r"^\s*([^#\s=]+)\s*=\s*([^#]+)\s*$", line)
-                        if match:
-                            key = match.group(1).lower()
-                            value = match.group(2).strip()
+                        # Drop comments, then skip lines without a key-value pair
+                        line = line.split("#", 1)[0]
+                        if "=" not in line:
+                            continue
+
+                        key, _, value = line.partition("=")
+                        key = key.strip().lower()
+                        value = value.strip()
+                        if key and value:
                             self.config[key] = value
 
             except FileNotFoundError as error:
@@ -103,6 +160,8 @@ class BitcoinConfig:
                     "Credentials not found. Please set credentials or path for bitcoin.conf file..."
                 )
 
+            self.config.update(rpc_creds)
+
             options.extend(
                 [
                     f"datadir={rpc_creds['datadir']}",
@@ -111,4 +170,50 @@ class BitcoinConfig:
                 ]
             )
 
-        return options
+        self._options = options
+        return list(options)
+
+    def generate_rpc_connection(self) -> Dict[str, str]:
+        """
+        Generate the settings for connecting to the node's JSON-RPC server.
+
+        Uses rpcconnect and rpcport if set, otherwise the local node on the
+        mainnet port. Credentials are rpcuser and rpcpassword if set,
+        otherwise the node's cookie file.
+
+        :return: The url, user and password for RPC calls.
+        :rtype: Dict[str, str]
+
+        :raises BitcoinConfigException: If no credentials are set and the
+            cookie file can't be read.
+
+        :Example:
+            >>> config = BitcoinConfig()
+            >>> rpc_connection = config.generate_rpc_connection()
+            >>> print(rpc_connection["url"])
+        """
+        self.generate_options()
+
+        host = self.config.get("rpcconnect", self.default_rpc_host)
+        port = self.config.get("rpcport", self.default_rpc_port)
+        rpc_connection = {
+            "url": f"http://{host}:{port}/",
+            "user": self.config.get("rpcuser"),
+            "password": self.config.get("rpcpassword"),
+        }
+
+        if rpc_connection["user"] is None or rpc_connection["password"] is None:
+            datadir = Path(self.config.get("datadir", Path.home() / ".bitcoin"))
+            cookie_path = datadir / self.config.get("rpccookiefile", ".cookie")
+            try:
+                with open(cookie_path, "r", encoding="utf-8") as file:
+                    user, _, password = file.read().strip().partition(":")
+            except OSError as error:
+                raise BitcoinConfigException(
+                    f"Credentials not found. Please set rpcuser and rpcpassword "
+                    f"or check the cookie file at {cookie_path}..."
+                ) from error
+            rpc_connection["user"] = user
+            rpc_connection["password"] = password
+
+        return rpc_connection
@@ -1,7 +1,10 @@
 """Main class for calculating estimated daily price."""
 from datetime import datetime, timedelta, timezone
+from logging import INFO
+from typing import List
 
 from src.bins import PriceBins
+from src.blocks import Block
 from src.exceptions import DailyPriceException
 from src.logger import init_logger
 from src.oscillator import BlockOscillator
@@ -10,6 +13,8 @@ from src.stencil import Stencil
 
 logger = init_logger("bitcoin_price_oracle")
 
+SECONDS_IN_DAY = 86400
+
 
 class BitcoinDailyPrice:
     """
@@ -33,25 +38,25 @@ class BitcoinDailyPrice:
         :type rpc: BitcoinRPCClient
         :param date_entered: The date to query in the format "YYYY-MM-DD".
         :type date_entered: str
+
+        :raises ValueError: If date_entered isn't in the format "YYYY-MM-DD".
         """
-        logger.info("Initializing...")
+        logger.debug("Initializing...")
 
         # initalize RPC client
         self.rpc = rpc
 
         # initialize dates
-        self.datetime_entered = datetime(
-            int(date_entered.split("-")[0]),
-            int(date_entered.split("-")[1]),
-            int(date_entered.split("-")[2]),
-            0,
-            0,
-            0,
-            tzinfo=timezone.utc,
+        # only a bare date is accepted, so the price day starts at utc midnight
+        self.datetime_entered = datetime.strptime(date_entered, "%Y-%m-%d").replace(
+            tzinfo=timezone.utc
         )
 
         self.prior_day = self.datetime_entered - timedelta(days=1)
 
+        # set by prepare
+        self.bins: PriceBins = None
+
         self.pass_values = {
             "price_day_timestamp": int(self.datetime_entered.timestamp()),
         }
@@ -67,7 +72,7 @@ class BitcoinDailyPrice:
                     is before the earliest recommended date of 2020-07-26..."
             )
 
-    async def run_estimate_price(self) -> None:
+    async def run_estimate_price(self) -> int:
         """
         Run the estimation process for BTC price.
 
@@ -76,27 +81,72 @@ class BitcoinDailyPrice:
         oscillator, getting target day blocks, removing outlier amounts, smoothing
         BTC bins, setting the curve sum, normalizing the curve, initiating the
         stencil, and running the stencil.
+
+        :return: Estimated BTC price in USD
+        :rtype: int
         """
-        logger.info(
-            "Running daily price estimate for %s...",
-            self.datetime_entered.strftime("%Y-%m-%d"),
-        )
+        block_heights = await self.prepare()
+
+        block_hashes = await self.rpc.get_block_hashes(block_heights)
+        async for block in self.rpc.iter_blocks(block_hashes):
+            self.add_block(block)
+
+        return self.finalize()
+
+    async def prepare(self) -> List[int]:
+        """
+        Find the price day block and the block heights needed for the estimate.
+
+        This lets callers estimating several days retrieve the blocks for all
+        of them at once, adding each to every day that needs it, before
+        calling finalize for each day.
+
+        :return: The heights of the blocks to pass to add_block.
+        :rtype: List[int]
+        """
+        if logger.isEnabledFor(INFO):
+            logger.info(
+                "Running daily price estimate for %s...",
+                self.datetime_entered.strftime("%Y-%m-%d"),
+            )
 
         await self._set_current_block()
 
-        logger.info("Running block oscillator...")
+        logger.debug("Running block oscillator...")
         price_day_block = await BlockOscillator(
             self.rpc, self.pass_values
         ).run_block_oscillator()
 
-        bins = PriceBins(self.rpc, price_day_block)
+        self.bins = PriceBins(
+            self.rpc, price_day_block, self.pass_values["price_day_timestamp"]
+        )
+
+        return self.bins.block_heights
+
+    def add_block(self, block: Block) -> None:
+        """
+        Add a block at one of the heights given by prepare.
+
+        :param block: A block with verbose transactions.
+        :type block: Block
+        """
+        self.bins.add_block(block)
+
+    def finalize(self) -> int:
+        """
+        Estimate the price once the blocks given by prepare have been added.
 
-        await bins.run_price_bins()
+        :return: Estimated BTC price in USD
+        :rtype: int
+        """
+        self.bins.process_curve()
 
-        price_estimate = await Stencil(bins).run_stencil()
+        price_estimate = Stencil(self.bins).run_stencil()
 
         logger.info("Price estimate: %s", price_estimate)
 
+        return price_estimate
+
     async def _set_current_block(self) -> None:
         """
         Set the current block and related time information.
@@ -109,30 +159,19 @@ class BitcoinDailyPrice:
         :raises Exception: If the entered datetime is not before the
             current date.
         """
-        logger.info("Setting current block...")
+        logger.debug("Setting current block...")
         self.pass_values["block_count"] = await self.rpc.get_block_count()
-        self.pass_values["latest_block_timestamp"] = (
-            await self.rpc.get_block_header(
-                await self.rpc.get_block_hash(self.pass_values["block_count"])
-            )
-        )["time"]
+        self.pass_values["latest_block_timestamp"] = await self.rpc.get_block_time(
+            self.pass_values["block_count"]
+        )
 
-        time_datetime = datetime.fromtimestamp(
-            self.pass_values["latest_block_timestamp"], tz=timezone.utc
+        # start of the utc day of the latest block
+        latest_block_timestamp = self.pass_values["latest_block_timestamp"]
+        latest_day_timestamp = latest_block_timestamp - (
+            latest_block_timestamp % SECONDS_IN_DAY
         )
 
-        if (
-            self.datetime_entered.timestamp()
-            >= datetime(
-                time_datetime.year,
-                time_datetime.month,
-                time_datetime.day,
-                0,
-                0,
-                0,
-                tzinfo=timezone.utc,
-            ).timestamp()
-        ):
+        if self.pass_values["price_day_timestamp"] >= latest_day_timestamp:
             raise DailyPriceException(
                 "The date entered is not before the current date, please try again..."
             )
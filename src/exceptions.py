@@ -38,3 +38,23 @@ class RPCException(Exception):
         :type message: str
         """
         super().__init__(message)
+
+
+class RPCCoolOffException(RPCException):
+    """Custom exception class for RPC calls failed fast while cooling off."""
+
+
+class RPCNodeException(RPCException):
+    """Custom exception class for errors returned by Bitcoin Core."""
+
+    def __init__(self, message: str, code: int):
+        """
+        Initialize the RPCNodeException instance.
+
+        :param message: The error message associated with the exception.
+        :type message: str
+        :param code: The JSON-RPC error code returned by the node.
+        :type code: int
+        """
+        super().__init__(message)
+        self.code = code
@@ -1,8 +1,19 @@
 """Class for block oscillator."""
-from typing import Dict, Tuple
+from asyncio import gather
+from os import getpid
+from pathlib import Path
+from typing import Dict, List, Tuple
 
+import orjson
+
+from src.logger import init_logger
 from src.rpc import BitcoinRPCClient
 
+logger = init_logger("bitcoin_price_oracle")
+
+# price day blocks found in this process by price day timestamp, oldest first
+_recent_anchors: Dict[int, int] = {}
+
 
 class BlockOscillator:
     """
@@ -15,6 +26,17 @@ class BlockOscillator:
     blocks_per_day: int = 144
     seconds_in_day: int = 86400
 
+    # number of recent price day blocks kept as anchors
+    max_anchors: int = 64
+
+    # price day blocks at least cache_confirmations deep are kept on disk
+    # by genesis block hash and price day timestamp, so later runs on the
+    # same chain don't have to find them again
+    day_blocks_path: Path = (
+        Path.home() / ".cache" / "bitcoin_price_oracle" / "day_blocks.json"
+    )
+    cache_confirmations: int = 6
+
     def __init__(self, rpc: BitcoinRPCClient, pass_values: Dict):
         """
         Initialize the BlockOscillator instance.
@@ -34,12 +56,29 @@ class BlockOscillator:
         Run the block oscillator to determine the price day block.
 
         This method executes the block oscillator algorithm to determine
-        the block on the price day.
+        the block on the price day, unless an earlier run saved it, and
+        keeps it as an anchor for finding the blocks of nearby days.
+        A saved block is only used once its block times confirm it is
+        still the first block of the price day.
 
         :return: Block on the price day
         :rtype: int
         """
-        return await self._block_oscillator()
+        chain = await self.rpc.get_block_hash(0)
+        saved_block = self._read_day_blocks(chain).get(str(self.price_day_timestamp))
+        if isinstance(saved_block, int) and await self._is_price_day_block(saved_block):
+            price_day_block = saved_block
+        else:
+            price_day_block = await self._block_oscillator()
+            if self._is_buried(price_day_block):
+                self._write_day_block(chain, price_day_block)
+
+        _recent_anchors.pop(self.price_day_timestamp, None)
+        _recent_anchors[self.price_day_timestamp] = price_day_block
+        if len(_recent_anchors) > self.max_anchors:
+            del _recent_anchors[next(iter(_recent_anchors))]
+
+        return price_day_block
 
     async def _set_oscillator_block(
         self, block_height_estimate: int
@@ -57,8 +96,7 @@ class BlockOscillator:
             jump estimate.
         :rtype: Tuple[int, int]
         """
-        block_hash = await self.rpc.get_block_hash(block_height_estimate)
-        block_timestamp = (await self.rpc.get_block_header(block_hash))["time"]
+        block_timestamp = await self.rpc.get_block_time(block_height_estimate)
 
         block_jump_estimate = self._block_estimate(
             block_timestamp - self.price_day_timestamp
@@ -75,14 +113,14 @@ class BlockOscillator:
         Bitcoin Core organizes blocks by height, not by time. As a result, it's not
         possible to query Bitcoin Core for a block at a specific time. This method
         works around this limitation by iteratively estimating the block heights
-        to approximate the desired time.
+        to approximate the desired time, then binary searching around the
+        estimate for the first block of the price day.
+
+        :return: Block on the price day
+        :rtype: int
         """
-        block_height_estimate = self.block_count - self._block_estimate(
-            self.latest_block_timestamp - self.price_day_timestamp
-        )
-        block_timestamp, block_jump_estimate = await self._set_oscillator_block(
-            block_height_estimate
-        )
+        block_height_estimate = self._anchored_block_estimate()
+        _, block_jump_estimate = await self._set_oscillator_block(block_height_estimate)
 
         last_estimate = 0
         last_last_estimate = 0
@@ -92,30 +130,205 @@ class BlockOscillator:
 
             # get block header or new estimate
             block_height_estimate = block_height_estimate - block_jump_estimate
-            block_timestamp, block_jump_estimate = await self._set_oscillator_block(
+            _, block_jump_estimate = await self._set_oscillator_block(
                 block_height_estimate
             )
 
-        if block_timestamp > self.price_day_timestamp:
-            # if the estimate was after price day look at earlier blocks
-            while block_timestamp > self.price_day_timestamp:
-                block_height_estimate -= 1
-                block_timestamp, block_jump_estimate = await self._set_oscillator_block(
-                    block_height_estimate
-                )
-            block_height_estimate += 1
+        # bracket the first block of the price day around the estimate
+        block_span = abs(block_jump_estimate) + 6
+        return await self._search_price_day_block(
+            block_height_estimate - block_span, block_height_estimate + block_span
+        )
 
-        elif block_timestamp < self.price_day_timestamp:
-            while block_timestamp < self.price_day_timestamp:
-                # increment the block by one, read new block header, check time
-                block_height_estimate += 1
-                if block_height_estimate >= self.block_count:
-                    break
-                block_timestamp, block_jump_estimate = await self._set_oscillator_block(
-                    block_height_estimate
+    async def _search_price_day_block(self, low: int, high: int) -> int:
+        """
+        Search for the first block of the price day between two heights.
+
+        Block times aren't strictly increasing, so the bracket is widened if
+        either end is on the wrong side of the start of the price day.
+
+        :param low: A block height before the price day.
+        :type low: int
+        :param high: A block height on or after the price day.
+        :type high: int
+
+        :return: Block on the price day
+        :rtype: int
+        """
+        low = max(low, 0)
+        high = min(high, self.block_count)
+        block_span = max(high - low, 1)
+
+        # the ends are usually on either side of the price day, so the
+        # first quarter points are probed in the same round trip as them
+        probes = self._quarter_points(low, high)
+        (low_timestamp, _), (high_timestamp, _), *probe_blocks = await gather(
+            *[self._set_oscillator_block(height) for height in [low, high, *probes]]
+        )
+
+        while low > 0 and low_timestamp >= self.price_day_timestamp:
+            block_span *= 2
+            low = max(low - block_span, 0)
+            low_timestamp, _ = await self._set_oscillator_block(low)
+            probe_blocks = None
+        while high < self.block_count and high_timestamp < self.price_day_timestamp:
+            block_span *= 2
+            high = min(high + block_span, self.block_count)
+            high_timestamp, _ = await self._set_oscillator_block(high)
+            probe_blocks = None
+
+        # search for the first block at or after the price day. Probing the
+        # quarter points at once cuts the bracket to a quarter per round trip
+        while high - low > 1:
+            if probe_blocks is None:
+                probes = self._quarter_points(low, high)
+                probe_blocks = await gather(
+                    *[self._set_oscillator_block(probe) for probe in probes]
                 )
+            for probe, (probe_timestamp, _) in zip(probes, probe_blocks):
+                if probe_timestamp < self.price_day_timestamp:
+                    low = probe
+                else:
+                    high = probe
+                    break
+            probe_blocks = None
+
+        return high
+
+    @staticmethod
+    def _quarter_points(low: int, high: int) -> List[int]:
+        """
+        Get the heights a quarter, half and three quarters between two heights.
+
+        :param low: The lower block height.
+        :type low: int
+        :param high: The higher block height.
+        :type high: int
+
+        :return: The distinct heights strictly between low and high, in order.
+        :rtype: List[int]
+        """
+        return sorted(
+            {low + (high - low) * quarter // 4 for quarter in (1, 2, 3)} - {low, high}
+        )
+
+    def _is_buried(self, block_height: int) -> bool:
+        """
+        Check if a block is at least cache_confirmations deep.
+
+        :param block_height: The block height.
+        :type block_height: int
+
+        :return: True if the block at block_height won't be reorganized.
+        :rtype: bool
+        """
+        return block_height <= self.block_count - self.cache_confirmations
+
+    async def _is_price_day_block(self, block_height: int) -> bool:
+        """
+        Check if a block is a buried first block of the price day.
+
+        :param block_height: The block height.
+        :type block_height: int
+
+        :return: True if the block is at least cache_confirmations deep,
+            at or after the start of the price day, and the block before
+            it is before the start of the price day.
+        :rtype: bool
+        """
+        if block_height < 0 or not self._is_buried(block_height):
+            return False
+        heights = [block_height - 1, block_height] if block_height else [block_height]
+        *previous_timestamp, block_timestamp = await gather(
+            *[self.rpc.get_block_time(height) for height in heights]
+        )
+        return block_timestamp >= self.price_day_timestamp and all(
+            timestamp < self.price_day_timestamp for timestamp in previous_timestamp
+        )
+
+    def _read_day_blocks_file(self) -> Dict[str, Dict[str, int]]:
+        """
+        Read the price day blocks saved by earlier runs for every chain.
+
+        A missing or unreadable file, or one that doesn't hold an object,
+        is treated as empty.
+
+        :return: Price day blocks by genesis block hash and price day
+            timestamp.
+        :rtype: Dict[str, Dict[str, int]]
+        """
+        try:
+            day_blocks = orjson.loads(self.day_blocks_path.read_bytes())
+        except (OSError, orjson.JSONDecodeError):
+            return {}
+        if not isinstance(day_blocks, dict):
+            return {}
+        return {
+            chain: chain_blocks
+            for chain, chain_blocks in day_blocks.items()
+            if isinstance(chain_blocks, dict)
+        }
+
+    def _read_day_blocks(self, chain: str) -> Dict[str, int]:
+        """
+        Read the price day blocks saved by earlier runs on a chain.
 
-        return block_height_estimate
+        :param chain: The genesis block hash of the chain.
+        :type chain: str
+
+        :return: Price day blocks by price day timestamp.
+        :rtype: Dict[str, int]
+        """
+        return self._read_day_blocks_file().get(chain, {})
+
+    def _write_day_block(self, chain: str, price_day_block: int) -> None:
+        """
+        Save the price day block for later runs on the same chain.
+
+        The file is read again right before writing so blocks saved by
+        other days in the meantime are kept, and replaced in one step so
+        it is never left partly written.
+
+        :param chain: The genesis block hash of the chain.
+        :type chain: str
+        :param price_day_block: The block on the price day.
+        :type price_day_block: int
+        """
+        day_blocks = self._read_day_blocks_file()
+        day_blocks.setdefault(chain, {})[
+            str(self.price_day_timestamp)
+        ] = price_day_block
+
+        temp_path = self.day_blocks_path.with_suffix(f".{getpid()}.tmp")
+        try:
+            self.day_blocks_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path.write_bytes(orjson.dumps(day_blocks))
+            temp_path.replace(self.day_blocks_path)
+        except OSError as error:
+            logger.warning(
+                "Could not save price day block to %s: %s", self.day_blocks_path, error
+            )
+
+    def _anchored_block_estimate(self) -> int:
+        """
+        Estimate the price day block from the nearest known block.
+
+        The known blocks are the latest block and the price day blocks
+        recently found for other days. Estimating from the one nearest in
+        time to the price day leaves the fewest blocks to search.
+
+        :return: The estimated price day block.
+        :rtype: int
+        """
+        anchor_timestamp, anchor_height = min(
+            [(self.latest_block_timestamp, self.block_count)]
+            + list(_recent_anchors.items()),
+            key=lambda anchor: abs(anchor[0] - self.price_day_timestamp),
+        )
+        block_height_estimate = anchor_height - self._block_estimate(
+            anchor_timestamp - self.price_day_timestamp
+        )
+        return min(max(block_height_estimate, 0), self.block_count)
 
     def _block_estimate(self, timestamp: int) -> int:
         """
@@ -124,6 +337,7 @@ class BlockOscillator:
         This estimation is based on the assumption that the Bitcoin network generates
         around 144 blocks in a day. It calculates the block number corresponding to
         the provided UNIX timestamp using the specified number of seconds in a day.
+        Timestamps are whole seconds, so integer arithmetic is exact.
 
         :param timestamp: The UNIX timestamp for which the block number is to
             be estimated.
@@ -133,4 +347,7 @@ class BlockOscillator:
             the given timestamp.
         :rtype: int
         """
-        return round(self.blocks_per_day * float(timestamp) / self.seconds_in_day)
+        # integer rounding, adding half a day rounds to the nearest block
+        return (
+            timestamp * self.blocks_per_day + self.seconds_in_day // 2
+        ) // self.seconds_in_day
@@ -1,58 +1,308 @@
 """Bitcoin Core RPC Client."""
-import json
-from asyncio import create_subprocess_exec, create_task, gather, subprocess
-from typing import Dict, List
+from asyncio import FIRST_COMPLETED
+from asyncio import TimeoutError as AsyncioTimeoutError
+from asyncio import create_task, gather, wait
+from collections import OrderedDict
+from functools import lru_cache
+from hashlib import sha256
+from itertools import count, islice
+from time import monotonic
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Generic,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
 
 import backoff
+import msgspec
+import orjson
+from aiohttp import BasicAuth, ClientError, ClientSession, ClientTimeout, TCPConnector
 
+from src.blocks import Block, BlockHeader
 from src.config import BitcoinConfig
-from src.exceptions import RPCException
+from src.exceptions import RPCCoolOffException, RPCException, RPCNodeException
 from src.logger import init_logger
 
 logger = init_logger("bitcoin_price_oracle")
 
+# clients returned by BitcoinRPCClient.shared by _shared_key, until the
+# last context using them exits
+_shared_clients: Dict[Tuple[Any, ...], "BitcoinRPCClient"] = {}
 
-class BitcoinRPCClient:
+# error codes returned by a node that can answer the call once it is ready,
+# like RPC_IN_WARMUP while it loads the block index
+_transient_error_codes = frozenset({-28})
+
+ResultT = TypeVar("ResultT")
+
+
+class _RPCError(msgspec.Struct):
+    """The error of a failed JSON-RPC call."""
+
+    code: int = 0
+    message: str = ""
+
+
+class _RPCResponse(msgspec.Struct, Generic[ResultT]):
+    """A JSON-RPC response with a result of type ResultT."""
+
+    result: Optional[ResultT] = None
+    error: Optional[_RPCError] = None
+    id: Any = None
+
+
+@lru_cache(maxsize=None)
+def _response_decoder(result_type: Any, batch: bool = False) -> msgspec.json.Decoder:
+    """
+    Get a decoder of JSON-RPC responses with results of result_type.
+
+    Typed results are decoded straight into their structs, skipping any
+    fields the struct doesn't have. Any results decode to builtin types.
+
+    :param result_type: The type of the results.
+    :type result_type: Any
+    :param batch: Decode a list of responses to a batch request.
+    :type batch: bool
+
+    :return: The response decoder.
+    :rtype: msgspec.json.Decoder
+    """
+    response_type = _RPCResponse[result_type]
+    return msgspec.json.Decoder(List[response_type] if batch else response_type)
+
+
+def _shared_key(
+    config: BitcoinConfig, rpc_connection: Dict[str, str]
+) -> Tuple[Any, ...]:
+    """
+    Get the key of the shared client for a config.
+
+    Configs get the same client only if they connect to the same node as
+    the same user with the same connection and batch settings. The key
+    holds a hash of the password instead of the password itself.
+
+    :param config: Bitcoin RPC configuration
+    :type config: BitcoinConfig
+    :param rpc_connection: The RPC connection settings of the config.
+    :type rpc_connection: Dict[str, str]
+
+    :return: The connection and batch settings of the config.
+    :rtype: Tuple[Any, ...]
+    """
+    return (
+        rpc_connection["url"],
+        rpc_connection["user"],
+        sha256(rpc_connection["password"].encode()).hexdigest(),
+        config.max_connections,
+        config.keepalive_timeout,
+        config.rpc_timeout,
+        config.rpc_batch,
+        config.rpc_batch_size,
+    )
+
+
+def _is_final(error: RPCException) -> bool:
+    """
+    Check if a failed RPC call would fail the same way if retried.
+
+    Calls failed fast because the client is cooling off, and calls the
+    node answered with an error, like a height out of range or a pruned
+    block, are given up on right away instead of retried. Node errors
+    with a code in _transient_error_codes are still retried.
+
+    :param error: The exception raised by the RPC call.
+    :type error: RPCException
+
+    :return: True if the call shouldn't be retried.
+    :rtype: bool
+    """
+    if isinstance(error, RPCNodeException):
+        return error.code not in _transient_error_codes
+    return isinstance(error, RPCCoolOffException)
+
+
+def _cool_off_unreachable_node(details: Dict) -> None:
+    """
+    Start the client cooling off once a call to an unreachable node gives up.
+
+    Errors returned by the node, like a height out of range, don't start
+    a cool off since the node is still answering.
+
+    :param details: The backoff details of the call given up on.
+    :type details: Dict
+    """
+    error = details["exception"]
+    if isinstance(error.__cause__, (ClientError, AsyncioTimeoutError)):
+        details["args"][0].cool_off()
+
+
+class _LRUCache(OrderedDict):
+    """Dictionary that drops its least recently used entry past maxsize."""
+
+    def __init__(self, maxsize: int):
+        """
+        Initialize the cache.
+
+        :param maxsize: The most entries kept.
+        :type maxsize: int
+        """
+        super().__init__()
+        self.maxsize = maxsize
+
+    def get(self, key, default=None):
+        """
+        Get a cached value and mark it as recently used.
+
+        :param key: The cache key.
+        :param default: The value returned if key isn't cached.
+
+        :return: The cached value, or default.
+        """
+        if key not in self:
+            return default
+        self.move_to_end(key)
+        return self[key]
+
+    def __setitem__(self, key, value):
+        """
+        Cache a value, dropping the least recently used entry past maxsize.
+
+        :param key: The cache key.
+        :param value: The value to cache.
+        """
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        if len(self) > self.maxsize:
+            self.popitem(last=False)
+
+
+class BitcoinRPCClient:  # pylint: disable=too-many-instance-attributes
     """
     A client for interacting with a Bitcoin Core node using RPC calls.
 
     This class provides methods for making various RPC calls to a Bitcoin Core
-    node using bitcoin-cli commands. It utilizes the BitcoinConfig class to
-    generate the necessary options for bitcoin-cli commands.
+    node over its JSON-RPC HTTP interface. Calls share one keep-alive HTTP
+    session, opened by the 'async with' statement. It utilizes the
+    BitcoinConfig class to get the connection settings.
 
     :Example:
-        >>> client = BitcoinRPCClient()
-        >>> block_count = await client.get_block_count()
+        >>> async with BitcoinRPCClient(config) as client:
+        >>>     block_count = await client.get_block_count()
         >>> print(f"Current block count: {block_count}")
     """
 
-    def __init__(self, config: BitcoinConfig):
+    # blocks this deep have their hash and time by height cached
+    cache_confirmations: int = 6
+
+    # most hashes and times kept, so long runs don't grow without bound
+    cache_size: int = 4096
+
+    # block hashes requested at once by iter_block_hashes
+    hash_chunk_size: int = 1000
+
+    # once a call gives up on an unreachable node, calls fail fast for this
+    # long instead of each retrying against it
+    cool_off_seconds: float = 10.0
+
+    def __init__(
+        self, config: BitcoinConfig, rpc_connection: Optional[Dict[str, str]] = None
+    ):
         """
         Initialize the BitcoinRPCClient.
 
         This constructor initializes the BitcoinRPCClient by setting up
-        necessary configurations and bitcoin-cli options.
+        necessary configurations and RPC connection settings.
 
         :param config: Bitcoin RPC configuration
         :type config: BitcoinConfig
+        :param rpc_connection: The RPC connection settings, if already
+            generated from config.
+        :type rpc_connection: Optional[Dict[str, str]]
 
         :Example:
             >>> client = BitcoinRPCClient(config)
         """
         self.conf = config
-        self.bitcoin_cli_options = self.conf.generate_options()
-        self.bitcoin_cli = ["bitcoin-cli"] + self.bitcoin_cli_options
+        self.rpc_connection = rpc_connection or self.conf.generate_rpc_connection()
+
+        # set by __aenter__, which counts the contexts using the session
+        # so it is only closed when the last one exits
+        self._session: ClientSession = None
+        self._request_ids = count()
+        self._users: int = 0
+
+        # monotonic time calls fail fast until, set by cool_off
+        self._cool_off_until: float = 0.0
+
+        # hashes and times by height, which don't change once blocks are
+        # buried. set by get_block_count
+        self._block_count: int = None
+        self._block_hashes: Dict[int, str] = _LRUCache(self.cache_size)
+        self._block_times: Dict[int, int] = _LRUCache(self.cache_size)
+
+    @classmethod
+    def shared(cls, config: BitcoinConfig) -> "BitcoinRPCClient":
+        """
+        Get the client shared by everything connecting with the same settings.
+
+        Parts of a program using the shared client share its connection
+        pool and caches instead of each opening their own connections to
+        the node. Each part can enter and exit it with 'async with', and
+        the session stays open until the last one exits. The client is
+        then no longer shared, and the next call makes a new one.
+
+        :param config: Bitcoin RPC configuration
+        :type config: BitcoinConfig
+
+        :return: The shared BitcoinRPCClient for the config's connection
+            settings.
+        :rtype: BitcoinRPCClient
+
+        :Example:
+            >>> async with BitcoinRPCClient.shared(config) as client:
+            >>>     block_count = await client.get_block_count()
+        """
+        # generated once, as it may read the cookie file
+        rpc_connection = config.generate_rpc_connection()
+        key = _shared_key(config, rpc_connection)
+        client = _shared_clients.get(key)
+        if client is None:
+            client = _shared_clients[key] = cls(config, rpc_connection)
+        return client
 
     async def __aenter__(self):
         """
         Enter the asynchronous context.
 
         This method is called when entering an asynchronous context using
-        the 'async with' statement.
+        the 'async with' statement. It opens the HTTP session shared by
+        all RPC calls, unless another context already has.
 
         :return: The BitcoinRPCClient instance
         :rtype: BitcoinRPCClient
         """
+        self._users += 1
+        if self._session is not None:
+            return self
+
+        self._session = ClientSession(
+            auth=BasicAuth(
+                self.rpc_connection["user"], self.rpc_connection["password"]
+            ),
+            connector=TCPConnector(
+                limit=self.conf.max_connections,
+                keepalive_timeout=self.conf.keepalive_timeout,
+            ),
+            timeout=ClientTimeout(total=self.conf.rpc_timeout),
+            # encode request bodies with orjson rather than the json module
+            json_serialize=lambda payload: orjson.dumps(payload).decode(),
+        )
         return self
 
     async def __aexit__(self, exc_type, exc_value, traceback):
@@ -60,7 +310,8 @@ class BitcoinRPCClient:
         Exit the asynchronous context.
 
         This method is called when exiting an asynchronous context using
-        the 'async with' statement. It performs any necessary cleanup actions.
+        the 'async with' statement. It closes the HTTP session once no
+        other context is using it.
 
         :param exc_type: The type of the exception that occurred
             (or None if no exception)
@@ -71,30 +322,226 @@ class BitcoinRPCClient:
         :param traceback: The traceback object (or None if no exception)
         :type traceback: traceback or None
         """
+        self._users = max(self._users - 1, 0)
+        if not self._users:
+            for key in [
+                key for key, client in _shared_clients.items() if client is self
+            ]:
+                del _shared_clients[key]
+            if self._session is not None:
+                await self._session.close()
+                self._session = None
+
         if exc_type:
             raise RPCException("RPC call failed...")
 
-    @backoff.on_exception(backoff.expo, RPCException("RPC call failed..."), max_tries=5)
-    async def _get_rpc_response(self, *args: List[str]) -> bytes:
+    @backoff.on_exception(
+        backoff.expo,
+        RPCException,
+        max_tries=5,
+        jitter=backoff.full_jitter,
+        giveup=_is_final,
+        on_giveup=_cool_off_unreachable_node,
+    )
+    async def _get_rpc_response(
+        self, method: str, *params: Any, result_type: Any = Any
+    ) -> Any:
         """
-        Execute a bitcoin-cli command and return the response.
+        Make a JSON-RPC call to the node and return its result.
 
-        This method executes a bitcoin-cli command asynchronously and
-        returns the response in bytes.
+        This method posts the call over the shared HTTP session and
+        returns the decoded result. Calls the node didn't answer, or
+        answered with a transient error, are retried with exponential
+        backoff.
 
-        :param args: A list of arguments for the bitcoin-cli command.
-        :type args: List[str]
+        :param method: The RPC method name.
+        :type method: str
+        :param params: The positional parameters for the RPC method.
+        :type params: Any
+        :param result_type: The type the result is decoded to.
+        :type result_type: Any
 
-        :return: The response from the bitcoin-cli command in bytes.
-        :rtype: bytes
+        :return: The decoded result of the RPC call.
+        :rtype: Any
+
+        :raises RPCException: If the request fails.
+        :raises RPCNodeException: If the node returns an error.
+        :raises RPCCoolOffException: If the client is cooling off.
 
         :Example:
             >>> response = await self._get_rpc_response("getblockcount")
         """
-        command = self.bitcoin_cli + list(args)
-        process = await create_subprocess_exec(*command, stdout=subprocess.PIPE)
-        response_bytes = await process.stdout.read()
-        return response_bytes
+        self._check_cool_off(f"RPC call {method}")
+
+        payload = {
+            "jsonrpc": "1.0",
+            "id": next(self._request_ids),
+            "method": method,
+            "params": list(params),
+        }
+
+        try:
+            async with self._session.post(
+                self.rpc_connection["url"], json=payload
+            ) as response:
+                response_bytes = await response.read()
+        except (ClientError, AsyncioTimeoutError) as error:
+            raise RPCException(f"RPC call {method} failed: {error!r}") from error
+
+        try:
+            rpc_response = _response_decoder(result_type).decode(response_bytes)
+        except msgspec.DecodeError as error:
+            raise RPCException(
+                f"RPC call {method} failed with HTTP status {response.status}..."
+            ) from error
+
+        if rpc_response.error is not None:
+            raise RPCNodeException(
+                f"RPC call {method} failed: {rpc_response.error.message}",
+                rpc_response.error.code,
+            )
+
+        return rpc_response.result
+
+    @backoff.on_exception(
+        backoff.expo,
+        RPCException,
+        max_tries=5,
+        jitter=backoff.full_jitter,
+        giveup=_is_final,
+        on_giveup=_cool_off_unreachable_node,
+    )
+    async def _get_rpc_batch(self, calls: List[Tuple[str, List[Any]]]) -> List[Any]:
+        """
+        Make several JSON-RPC calls to the node in one batch request.
+
+        This method posts all calls as one JSON array over the shared HTTP
+        session, so they share one round trip. Batches the node didn't
+        answer in full, or answered with a transient error, are retried
+        with exponential backoff.
+
+        :param calls: The RPC method name and parameters of each call.
+        :type calls: List[Tuple[str, List[Any]]]
+
+        :return: The decoded results of the RPC calls, in the order of calls.
+        :rtype: List[Any]
+
+        :raises RPCException: If the request fails.
+        :raises RPCNodeException: If the node returns an error for any call.
+        :raises RPCCoolOffException: If the client is cooling off.
+
+        :Example:
+            >>> hashes = await self._get_rpc_batch([("getblockhash", [1])])
+        """
+        if not calls:
+            return []
+
+        self._check_cool_off("RPC batch call")
+
+        payload = [
+            {
+                "jsonrpc": "1.0",
+                "id": next(self._request_ids),
+                "method": method,
+                "params": params,
+            }
+            for method, params in calls
+        ]
+
+        try:
+            async with self._session.post(
+                self.rpc_connection["url"], json=payload
+            ) as response:
+                response_bytes = await response.read()
+        except (ClientError, AsyncioTimeoutError) as error:
+            raise RPCException(f"RPC batch call failed: {error!r}") from error
+
+        # a batch the node can't run is answered with a single error
+        # response instead of a list, which fails to decode too
+        try:
+            rpc_responses = _response_decoder(Any, batch=True).decode(response_bytes)
+        except msgspec.DecodeError as error:
+            raise RPCException(
+                f"RPC batch call failed with HTTP status {response.status}..."
+            ) from error
+
+        # the node may answer in any order, match results to calls by id
+        results = {}
+        for rpc_response in rpc_responses:
+            if rpc_response.error is not None:
+                raise RPCNodeException(
+                    f"RPC batch call failed: {rpc_response.error.message}",
+                    rpc_response.error.code,
+                )
+            results[rpc_response.id] = rpc_response.result
+
+        missing_calls = [call for call in payload if call["id"] not in results]
+        if missing_calls:
+            raise RPCException(
+                "RPC batch call failed: no result for "
+                + ", ".join(
+                    f"{call['method']} {call['params']}" for call in missing_calls
+                )
+            )
+
+        return [results[call["id"]] for call in payload]
+
+    def cool_off(self) -> None:
+        """
+        Fail calls fast for cool_off_seconds without calling the node.
+
+        This is started when a call gives up on an unreachable node, so a
+        node that is down isn't hit by every pending call's retries.
+        """
+        self._cool_off_until = monotonic() + self.cool_off_seconds
+
+    def _check_cool_off(self, call: str) -> None:
+        """
+        Fail a call fast if the client is cooling off.
+
+        :param call: A description of the call for the error message.
+        :type call: str
+
+        :raises RPCCoolOffException: If the client is cooling off.
+        """
+        cool_off_seconds = self._cool_off_until - monotonic()
+        if cool_off_seconds > 0:
+            raise RPCCoolOffException(
+                f"{call} skipped, node unreachable. "
+                f"Retry in {cool_off_seconds:.0f} seconds..."
+            )
+
+    async def _get_rpc_calls(self, calls: List[Tuple[str, List[Any]]]) -> List[Any]:
+        """
+        Make several JSON-RPC calls to the node.
+
+        The calls are sent as batch requests of at most rpc_batch_size
+        calls, or as single requests if rpc_batch is off in the config.
+        Either way the requests run in parallel over the session's
+        connection pool. Only used for calls with small results, like
+        getblockhash, since the node buffers a whole batch response.
+
+        :param calls: The RPC method name and parameters of each call.
+        :type calls: List[Tuple[str, List[Any]]]
+
+        :return: The decoded results of the RPC calls, in the order of calls.
+        :rtype: List[Any]
+        """
+        if self.conf.rpc_batch:
+            batch_size = self.conf.rpc_batch_size
+            batches = await gather(
+                *[
+                    self._get_rpc_batch(calls[start : start + batch_size])
+                    for start in range(0, len(calls), batch_size)
+                ]
+            )
+            return [result for batch in batches for result in batch]
+
+        return list(
+            await gather(
+                *[self._get_rpc_response(method, *params) for method, params in calls]
+            )
+        )
 
     async def get_block_count(self) -> int:
         """
@@ -109,14 +556,16 @@ class BitcoinRPCClient:
         :Example:
             >>> block_count = await self.get_block_count()
         """
-        return int(await self._get_rpc_response("getblockcount"))
+        self._block_count = await self._get_rpc_response("getblockcount")
+        return self._block_count
 
     async def get_block_hash(self, block_height: int) -> str:
         """
         Get the block hash for a given block height.
 
         This method retrieves the block hash for a given block height from
-        the Bitcoin Core node.
+        the Bitcoin Core node. Hashes of blocks at least
+        cache_confirmations deep are cached, as they won't be reorganized.
 
         :param block_height: The block height.
         :type block_height: int
@@ -127,13 +576,63 @@ class BitcoinRPCClient:
         :Example:
             >>> block_hash = await self.get_block_hash(600000)
         """
-        return (await self._get_rpc_response("getblockhash", str(block_height))).decode(
-            "utf-8"
-        )[:64]
+        block_hash = self._block_hashes.get(block_height)
+        if block_hash is None:
+            block_hash = await self._get_rpc_response("getblockhash", block_height)
+            self._cache_block_hash(block_height, block_hash)
+        return block_hash
+
+    async def get_block_hash_bytes(self, block_height: int) -> bytes:
+        """
+        Get the block hash for a given block height as raw bytes.
+
+        The RPC returns hashes as hex in display order, which is the
+        reverse of the byte order used inside blocks and for header and
+        merkle hashing. The bytes are returned in that internal order.
+
+        :param block_height: The block height.
+        :type block_height: int
+
+        :return: The 32 byte block hash in internal byte order.
+        :rtype: bytes
+
+        :Example:
+            >>> block_hash = await self.get_block_hash_bytes(600000)
+        """
+        return bytes.fromhex(await self.get_block_hash(block_height))[::-1]
+
+    def _cache_block_hash(self, block_height: int, block_hash: str) -> None:
+        """
+        Cache a block hash if the block is at least cache_confirmations deep.
+
+        :param block_height: The block height.
+        :type block_height: int
+        :param block_hash: The block hash at block_height.
+        :type block_hash: str
+        """
+        if self._is_buried(block_height):
+            self._block_hashes[block_height] = block_hash
+
+    def _is_buried(self, block_height: int) -> bool:
+        """
+        Check if a block is at least cache_confirmations deep.
+
+        :param block_height: The block height.
+        :type block_height: int
+
+        :return: True if the block at block_height won't be reorganized.
+        :rtype: bool
+        """
+        return (
+            self._block_count is not None
+            and block_height <= self._block_count - self.cache_confirmations
+        )
 
     async def get_block_hashes(self, block_heights: List[int]) -> List[str]:
         """
-        Get block hashes for a list of block heights asynchronously.
+        Get block hashes for a list of block heights together.
+
+        Heights with cached hashes are left out of the request.
 
         :param block_heights: List of block heights for which to retrieve
             block hashes.
@@ -142,11 +641,46 @@ class BitcoinRPCClient:
             heights.
         :rtype: List[str]
         """
-        return await gather(
-            *[create_task(self.get_block_hash(height)) for height in block_heights]
+        block_hashes = {
+            height: self._block_hashes.get(height) for height in block_heights
+        }
+        missing_heights = [
+            height for height, block_hash in block_hashes.items() if block_hash is None
+        ]
+        missing_hashes = await self._get_rpc_calls(
+            [("getblockhash", [height]) for height in missing_heights]
         )
+        for height, block_hash in zip(missing_heights, missing_hashes):
+            block_hashes[height] = block_hash
+            self._cache_block_hash(height, block_hash)
+
+        return [block_hashes[height] for height in block_heights]
 
-    async def get_block_header(self, block_hash: str) -> Dict:
+    async def iter_block_hashes(
+        self, block_heights: Iterable[int]
+    ) -> AsyncIterator[Tuple[int, str]]:
+        """
+        Yield the height and hash of each block height in order.
+
+        Hashes are requested hash_chunk_size heights at a time, so only one
+        chunk is held in memory, even for every height of the chain.
+
+        :param block_heights: The block heights, which may be any iterable.
+        :type block_heights: Iterable[int]
+        :return: An async iterator of block heights and their hashes.
+        :rtype: AsyncIterator[Tuple[int, str]]
+
+        :Example:
+            >>> async for height, block_hash in self.iter_block_hashes(range(10)):
+            >>>     print(height, block_hash)
+        """
+        heights = iter(block_heights)
+        while block_heights_chunk := list(islice(heights, self.hash_chunk_size)):
+            block_hashes = await self.get_block_hashes(block_heights_chunk)
+            for height_and_hash in zip(block_heights_chunk, block_hashes):
+                yield height_and_hash
+
+    async def get_block_header(self, block_hash: str) -> BlockHeader:
         """
         Get the block header for a given block hash.
 
@@ -156,48 +690,128 @@ class BitcoinRPCClient:
         :param block_hash: The block hash.
         :type block_hash: str
 
-        :return: The block header as a dictionary.
-        :rtype: Dict
+        :return: The block header.
+        :rtype: BlockHeader
 
         :Example:
             >>> block_header = await self.get_block_header("block_hash")
         """
-        return json.loads(
-            (await self._get_rpc_response("getblockheader", block_hash, "true")).decode(
-                "utf-8"
-            )
+        return await self._get_rpc_response(
+            "getblockheader", block_hash, True, result_type=BlockHeader
         )
 
-    async def get_block(self, block_hash: str) -> Dict:
+    async def get_block_time(self, block_height: int) -> int:
+        """
+        Get the block time for a given block height.
+
+        This method retrieves the time of the block at a given height from
+        the Bitcoin Core node with getblockstats, which takes the height
+        directly, so it is one call instead of getblockhash and
+        getblockheader. Times of blocks at least cache_confirmations deep
+        are cached.
+
+        :param block_height: The block height.
+        :type block_height: int
+
+        :return: The block time as a UNIX timestamp.
+        :rtype: int
+
+        :Example:
+            >>> block_time = await self.get_block_time(600000)
+        """
+        block_time = self._block_times.get(block_height)
+        if block_time is None:
+            block_time = (
+                await self._get_rpc_response("getblockstats", block_height, ["time"])
+            )["time"]
+            if self._is_buried(block_height):
+                self._block_times[block_height] = block_time
+        return block_time
+
+    async def get_block(self, block_hash: str) -> Block:
         """
         Get the block information for a given block hash.
 
         This method retrieves detailed block information for a given block
-        hash from the Bitcoin Core node. 2 is verbosity.
+        hash from the Bitcoin Core node. 2 is verbosity. Only the fields of
+        Block are decoded from the response.
 
         :param block_hash: The block hash.
         :type block_hash: str
 
-        :return: Detailed block information as a dictionary.
-        :rtype: Dict
+        :return: The block with its transaction outputs.
+        :rtype: Block
 
         :Example:
             >>> block_info = await self.get_block("block_hash")
         """
-        return json.loads(
-            (await self._get_rpc_response("getblock", block_hash, "2")).decode("utf-8")
+        return await self._get_rpc_response(
+            "getblock", block_hash, 2, result_type=Block
         )
 
-    async def get_blocks(self, block_hashes: List[str]) -> List[Dict]:
+    async def get_blocks(self, block_hashes: List[str]) -> List[Block]:
         """
-        Get block information for a list of block hashes.
+        Get block information for a list of block hashes together.
+
+        Blocks are requested one per call in parallel over the session's
+        connection pool, never batched. A batch of verbose blocks would be
+        buffered whole by the node before any of it is sent. All blocks
+        are held in memory, so iter_blocks is better for long lists.
 
         :param block_hashes: A list of block hashes for which block
             information is requested.
         :type block_hashes: list[str]
-        :return: A list of dictionaries containing block information.
-        :rtype: list[dict]
+        :return: A list of blocks with their transaction outputs.
+        :rtype: list[Block]
         """
-        return await gather(
-            *[create_task(self.get_block(bhash)) for bhash in block_hashes]
-        )
+        return list(await gather(*[self.get_block(bhash) for bhash in block_hashes]))
+
+    async def iter_blocks(self, block_hashes: List[str]) -> AsyncIterator[Block]:
+        """
+        Yield block information for a list of block hashes as it arrives.
+
+        At most max_connections blocks are requested at once, so only the
+        blocks in flight are held in memory instead of the whole list.
+        Blocks are yielded in the order they complete, not the order of
+        block_hashes. If requests fail, the blocks completed along with
+        them are still yielded before the first failure is raised.
+
+        :param block_hashes: A list of block hashes for which block
+            information is requested.
+        :type block_hashes: list[str]
+        :return: An async iterator of blocks with their transaction outputs.
+        :rtype: AsyncIterator[Block]
+
+        :Example:
+            >>> async for block in self.iter_blocks(block_hashes):
+            >>>     print(block.height)
+        """
+        hashes = iter(block_hashes)
+        pending = set()
+        try:
+            for bhash in hashes:
+                pending.add(create_task(self.get_block(bhash)))
+                if len(pending) >= self.conf.max_connections:
+                    break
+
+            while pending:
+                done, pending = await wait(pending, return_when=FIRST_COMPLETED)
+                # every completed task is read before anything is raised, so
+                # no failure is left unretrieved and no block is dropped
+                done = list(done)
+                errors = [task.exception() for task in done]
+                failed = any(errors)
+                for task, error in zip(done, errors):
+                    if error is None:
+                        bhash = None if failed else next(hashes, None)
+                        if bhash is not None:
+                            pending.add(create_task(self.get_block(bhash)))
+                        yield task.result()
+                if failed:
+                    error, *other_errors = [error for error in errors if error]
+                    for other_error in other_errors:
+                        logger.warning("Block request also failed: %s", other_error)
+                    raise error
+        finally:
+            for task in pending:
+                task.cancel()
@@ -1,7 +1,9 @@
 """Main class for calculating estimated daily price."""
 import dataclasses
-from asyncio import create_task, gather
-from typing import Dict, List, Literal, Tuple
+from logging import INFO
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
 
 from src.bins import PriceBins
 from src.logger import init_logger
@@ -9,12 +11,21 @@ from src.logger import init_logger
 logger = init_logger("bitcoin_price_oracle")
 
 
-@dataclasses.dataclass
-class StencilValues:
-    """Dataclass representing the stencil values for the Stencil class."""
+def _generate_stencil_array(values: Iterable, dtype: type) -> np.ndarray:
+    """
+    Generate a read-only array of stencil bins or weights.
+
+    :param values: The stencil bin numbers or weights.
+    :type values: Iterable
+    :param dtype: The data type of the array.
+    :type dtype: type
 
-    values: Dict[int, float]
-    round_usd_stencil: List[float]
+    :return: A read-only array of the values.
+    :rtype: np.ndarray
+    """
+    stencil_array = np.fromiter(values, dtype=dtype)
+    stencil_array.setflags(write=False)
+    return stencil_array
 
 
 @dataclasses.dataclass
@@ -31,8 +42,8 @@ class BitcoinDailyPriceValues:
     """Dataclass representing the values from the BitcoinDailyPrice class."""
 
     number_of_bins: int
-    output_bell_curve_bins: List[int]
-    output_bell_curve_bin_counts: List[int]
+    output_bell_curve_bins: np.ndarray
+    output_bell_curve_bin_counts: np.ndarray
 
 
 class Stencil:
@@ -50,8 +61,59 @@ class Stencil:
     best_slide_score: float = 0.0
     best_slide: int = 0
 
+    # round usd stencil values by bin number
+    stencil_values: Dict[int, float] = {
+        401: 0.0005957955691168063,  # $1
+        402: 0.0004454790662303128,  # (next one for tx/atm fees)
+        429: 0.0001763099393598914,  # $1.50
+        430: 0.0001851801497144573,
+        461: 0.0006205616481885794,  # $2
+        462: 0.0005985696860584984,
+        496: 0.0006919505728046619,  # $3
+        497: 0.0008912933078342840,
+        540: 0.0009372916238804205,  # $5
+        541: 0.0017125522985034724,  # (larger needed range for fees)
+        600: 0.0021702347223143030,
+        601: 0.0037018622326411380,  # $10
+        602: 0.0027322168706743802,
+        603: 0.0016268322583097678,  # (larger needed range for fees)
+        604: 0.0012601953416497664,
+        661: 0.0041425242880295460,  # $20
+        662: 0.0039247767475640830,
+        696: 0.0032399441632017228,  # $30
+        697: 0.0037112959007355585,
+        740: 0.0049921908828370000,  # $50
+        741: 0.0070636869018197105,
+        801: 0.0080000000000000000,  # $100
+        802: 0.0065431388282424440,  # (larger needed range for fees)
+        803: 0.0044279509203361735,
+        861: 0.0046132440551747015,  # $200
+        862: 0.0043647851395531140,
+        896: 0.0031980892880846567,  # $300
+        897: 0.0034237641632481910,
+        939: 0.0025995335505435034,  # $500
+        940: 0.0032631930982226645,  # (larger needed range for fees)
+        941: 0.0042753262790881080,
+        1001: 0.0037699501474772350,  # $1,000
+        1002: 0.0030872891064215764,  # (larger needed range for fees)
+        1003: 0.0023237040836798163,
+        1061: 0.0023671764210889895,  # $2,000
+        1062: 0.0020106877104798474,
+        1140: 0.0009099214128654502,  # $3,000
+        1141: 0.0012008546799361498,
+        1201: 0.0007862586076341524,  # $10,000
+        1202: 0.0006900048077192579,
+    }
+
+    # the stencil is the same for every day, so its non-zero bins and their
+    # weights are read into arrays once. Weights are float32 like the bin
+    # counts, so scores are computed without upcasting the counts
+    stencil_bins: np.ndarray = _generate_stencil_array(stencil_values, np.intp)
+    stencil_weights: np.ndarray = _generate_stencil_array(
+        stencil_values.values(), np.float32
+    )
+
     bounds: Bounds
-    values: StencilValues
 
     bitcoin_daily_price_values: BitcoinDailyPriceValues
 
@@ -73,118 +135,62 @@ class Stencil:
             lower_bound=bins.lower_bound, upper_bound=bins.upper_bound, btc_bound=1401
         )
 
-        self.stencil_values = StencilValues(
-            values={
-                401: 0.0005957955691168063,  # $1
-                402: 0.0004454790662303128,  # (next one for tx/atm fees)
-                429: 0.0001763099393598914,  # $1.50
-                430: 0.0001851801497144573,
-                461: 0.0006205616481885794,  # $2
-                462: 0.0005985696860584984,
-                496: 0.0006919505728046619,  # $3
-                497: 0.0008912933078342840,
-                540: 0.0009372916238804205,  # $5
-                541: 0.0017125522985034724,  # (larger needed range for fees)
-                600: 0.0021702347223143030,
-                601: 0.0037018622326411380,  # $10
-                602: 0.0027322168706743802,
-                603: 0.0016268322583097678,  # (larger needed range for fees)
-                604: 0.0012601953416497664,
-                661: 0.0041425242880295460,  # $20
-                662: 0.0039247767475640830,
-                696: 0.0032399441632017228,  # $30
-                697: 0.0037112959007355585,
-                740: 0.0049921908828370000,  # $50
-                741: 0.0070636869018197105,
-                801: 0.0080000000000000000,  # $100
-                802: 0.0065431388282424440,  # (larger needed range for fees)
-                803: 0.0044279509203361735,
-                861: 0.0046132440551747015,  # $200
-                862: 0.0043647851395531140,
-                896: 0.0031980892880846567,  # $300
-                897: 0.0034237641632481910,
-                939: 0.0025995335505435034,  # $500
-                940: 0.0032631930982226645,  # (larger needed range for fees)
-                941: 0.0042753262790881080,
-                1001: 0.0037699501474772350,  # $1,000
-                1002: 0.0030872891064215764,  # (larger needed range for fees)
-                1003: 0.0023237040836798163,
-                1061: 0.0023671764210889895,  # $2,000
-                1062: 0.0020106877104798474,
-                1140: 0.0009099214128654502,  # $3,000
-                1141: 0.0012008546799361498,
-                1201: 0.0007862586076341524,  # $10,000
-                1202: 0.0006900048077192579,
-            },
-            round_usd_stencil=[0.0] * bins.number_of_bins,
-        )
-
         self.bitcoin_daily_price_values = BitcoinDailyPriceValues(
             number_of_bins=bins.number_of_bins,
             output_bell_curve_bins=bins.output_bell_curve_bins,
             output_bell_curve_bin_counts=bins.output_bell_curve_bin_counts,
         )
 
-    async def run_stencil(self) -> int:
+    def run_stencil(self) -> int:
         """
         Run the stencil algorithm to estimate the BTC price.
 
         This method executes the steps of the stencil algorithm to
-        estimate the BTC price. It populates the stencil, finds the
+        estimate the BTC price. It finds the
         best slide, calculates neighbor scores, calculates the price
         estimate, and logs the estimate.
 
         :return: Estimated BTC price in USD
         :rtype: int
         """
-        logger.info("Running stencil...")
-        self._populate_stencil()
-
-        scores = await gather(
-            *[
-                create_task(self._find_best_slide()),
-                create_task(self._get_neighbor_scores()),
-            ]
+        logger.debug("Running stencil...")
+
+        # score one slide past each end of the range for the neighbors
+        slide_scores = self._calculate_slide_scores(
+            self.min_slide - 1, self.max_slide + 1
         )
 
+        btc_in_usd_best = self._find_best_slide(slide_scores[1:-1])
+        neighbor_score, btc_in_usd_2nd = self._get_neighbor_scores(slide_scores)
+
         price_estimate = self._calculate_price_estimate(
-            scores[0], scores[1][0], scores[1][1]
-        )
-        logger.info(
-            "The btc price estimate is: $%s",
-            f"{price_estimate:,}",
+            btc_in_usd_best, neighbor_score, btc_in_usd_2nd
         )
+        if logger.isEnabledFor(INFO):
+            logger.info(
+                "The btc price estimate is: $%s",
+                f"{price_estimate:,}",
+            )
         return price_estimate
 
-    def _populate_stencil(self):
-        """
-        Populate the round USD stencil with specified values.
-
-        This method populates the round USD stencil with predefined
-        values at specific indices.
-        """
-        for index, value in self.stencil_values.values.items():
-            self.stencil_values.round_usd_stencil[index] = value
-
-    async def _find_best_slide(self) -> float:
+    def _find_best_slide(self, slide_scores: np.ndarray) -> float:
         """
         Find the best slide for the curve to maximize the slide score.
 
-        This method iterates through the specified range of slides,
-        calculates slide scores, and updates the best slide and its
-        score accordingly.
+        This method sets the best slide, its score and the score totals
+        from the slide scores of the specified range of slides.
+
+        :param slide_scores: The slide scores from min_slide to max_slide.
+        :type slide_scores: np.ndarray
 
         :return: The estimated USD price for the best slide.
         :rtype: float
         """
-        for slide in range(self.min_slide, self.max_slide):
-            slide_score = self._calculate_slide_score(slide)
-            self.total_score += slide_score
-            self.number_of_scores += 1
-
-            if slide_score > self.best_slide_score:
-                self.best_slide_score = slide_score
-                self.best_slide = slide
+        best_slide_index = int(slide_scores.argmax())
+        self.best_slide = self.min_slide + best_slide_index
+        self.best_slide_score = float(slide_scores[best_slide_index])
+        self.total_score = float(slide_scores.sum())
+        self.number_of_scores = slide_scores.size
 
         # estimate the usd price of the best slide
         usd100_in_btc_best = self.bitcoin_daily_price_values.output_bell_curve_bins[
@@ -194,85 +200,66 @@ class Stencil:
 
         return btc_in_usd_best
 
-    def _calculate_slide_score(self, slide: int) -> float:
+    def _calculate_slide_scores(self, first_slide: int, last_slide: int) -> np.ndarray:
         """
-        Calculate the slide score for a given slide value.
+        Calculate the slide scores for every slide from first_slide to last_slide.
 
-        This method calculates the slide score by shifting the curve and
-        multiplying the shifted curve with the round USD stencil, summing
-        the product.
+        Each slide score is the dot product of the curve shifted by the
+        slide with the round USD stencil. The stencil is zero outside of its
+        40 bins, so only the counts at the shifted stencil bins are gathered
+        and weighted.
 
-        :param slide: The slide value for shifting the curve.
-        :type slide: int
+        :param first_slide: The first slide to score.
+        :type first_slide: int
+        :param last_slide: The slide after the last slide to score.
+        :type last_slide: int
 
-        :return: The calculated slide score.
-        :rtype: float
+        :return: The slide scores, starting at first_slide.
+        :rtype: np.ndarray
         """
-        shifted_curve = self.bitcoin_daily_price_values.output_bell_curve_bin_counts[
-            self.bounds.lower_bound + slide : self.bounds.btc_bound + slide
-        ]
-        slide_score = sum(
-            curve * self.stencil_values.round_usd_stencil[n + self.bounds.lower_bound]
-            for n, curve in enumerate(shifted_curve)
+        # the stencil only applies between the lower and btc bounds
+        in_bounds = (self.stencil_bins >= self.bounds.lower_bound) & (
+            self.stencil_bins < self.bounds.btc_bound
         )
-        return slide_score
+        stencil_bins = self.stencil_bins[in_bounds]
+        stencil_weights = self.stencil_weights[in_bounds]
+        counts = self.bitcoin_daily_price_values.output_bell_curve_bin_counts
 
-    async def _get_neighbor_scores(self) -> Tuple[float, int]:
+        slides = np.arange(first_slide, last_slide)
+        return stencil_weights @ counts[stencil_bins[:, np.newaxis] + slides]
+
+    def _get_neighbor_scores(self, slide_scores: np.ndarray) -> Tuple[float, int]:
         """
         Get the scores of the neighboring slides.
 
-        This method calculates the scores of the neighboring slides (up and down),
-        determines the best neighbor based on the higher score, and computes the
-        USD price estimation for the best neighbor.
+        This method looks up the scores of the neighboring slides (up and down)
+        in the slide scores, determines the best neighbor based on the higher
+        score, and computes the USD price estimation for the best neighbor.
+
+        :param slide_scores: The slide scores from one below min_slide to
+            one above max_slide.
+        :type slide_scores: np.ndarray
 
         :return: A tuple containing the score of the best neighbor and its USD price.
         :rtype: tuple[float, float]
         """
         # Find best slide neighbor (either up or down)
-        scores = await gather(
-            *[
-                create_task(self._calculate_neighbor_score("up")),
-                create_task(self._calculate_neighbor_score("down")),
-            ]
-        )
+        best_slide_index = self.best_slide - self.min_slide + 1
+        up_score = float(slide_scores[best_slide_index + 1])
+        down_score = float(slide_scores[best_slide_index - 1])
 
         # Determine the best neighbor
-        neighbor_score = scores[0] if scores[0] > scores[1] else scores[1]
+        neighbor_score = up_score if up_score > down_score else down_score
 
         # get best neighbor usd price
         usd100_in_btc_2nd = self.bitcoin_daily_price_values.output_bell_curve_bins[
-            801 + self.best_slide + (1 if scores[0] > scores[1] else -1)
+            801 + self.best_slide + (1 if up_score > down_score else -1)
         ]
 
         btc_in_usd_2nd = 100 / (usd100_in_btc_2nd)
 
         return neighbor_score, btc_in_usd_2nd
 
-    async def _calculate_neighbor_score(
-        self, direction: Literal["up", "down"]
-    ) -> float:
-        """
-        Calculate the score of the neighboring slide in the specified direction.
-
-        :param direction: The direction to calculate the neighboring slide score.
-            Should be either "up" or "down".
-        :type direction: Literal["up", "down"]
-
-        :return: The calculated score of the neighboring slide.
-        :rtype: float
-        """
-        slide_change = {"up": 1, "down": -1}.get(direction, 0)
-        slide = self.best_slide + slide_change
-        neighbor_curve = self.bitcoin_daily_price_values.output_bell_curve_bin_counts[
-            self.bounds.lower_bound + slide : self.bounds.btc_bound + slide
-        ]
-        neighbor_score = sum(
-            neighbor_curve[n]
-            * self.stencil_values.round_usd_stencil[n + self.bounds.lower_bound]
-            for n in range(len(neighbor_curve))
-        )
-        return neighbor_score
-
     def _calculate_price_estimate(
         self, btc_in_usd_best: float, neighbor_score: float, btc_in_usd_2nd: float
     ) -> int:
@@ -0,0 +1,55 @@
+from math import log10
+from unittest.mock import MagicMock
+
+import numpy as np
+
+from src.bins import PriceBins
+
+
+def reference_bin_counts(bins: PriceBins, amounts) -> list:
+    # Scalar estimate-then-walk search the bins were originally built with
+    counts = [0.0] * bins.number_of_bins
+    for amount in amounts:
+        if 1e-6 < amount < 1e6:
+            bin_percentage = (log10(amount) - bins.first_bin_value) / (
+                bins.range_bin_values
+            )
+            bin_number_est = int(bin_percentage * bins.number_of_bins)
+            while (
+                bin_number_est < bins.number_of_bins
+                and bins.output_bell_curve_bins[bin_number_est] <= amount
+            ):
+                bin_number_est += 1
+            counts[bin_number_est - 1] += 1.0
+    return counts
+
+
+def test_bin_amounts_matches_reference():
+    bins = PriceBins(MagicMock(), 800000, 1690848000)
+    rng = np.random.default_rng(21)
+    amounts = np.concatenate(
+        [
+            10 ** rng.uniform(-7, 7, 5000),
+            [0.0, 1e-6, 1e6, 0.00001, 0.0001, 0.001, 0.01, 0.1, 1.0, 0.5, 0.3],
+            # amounts exactly on, and just around, every bin value
+            PriceBins.output_bell_curve_bins[1:],
+            np.nextafter(PriceBins.output_bell_curve_bins[1:], 0),
+            np.nextafter(PriceBins.output_bell_curve_bins[1:], np.inf),
+        ]
+    )
+
+    bins._bin_amounts(amounts)
+
+    assert list(bins.output_bell_curve_bin_counts) == reference_bin_counts(
+        bins, amounts
+    )
+
+
+def test_bin_amounts_accumulates():
+    bins = PriceBins(MagicMock(), 800000, 1690848000)
+
+    bins._bin_amounts(np.array([0.01, 0.01]))
+    bins._bin_amounts(np.array([0.01]))
+
+    assert bins.output_bell_curve_bin_counts.sum() == 3.0
+    assert bins.output_bell_curve_bin_counts[801] == 3.0
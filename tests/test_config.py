@@ -1,10 +1,9 @@
-import sys
 import unittest
-from os import path
 from pathlib import Path
 from unittest.mock import patch
 
-sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
+import pytest
+
 from src.config import BitcoinConfig
 from src.exceptions import BitcoinConfigException
 
@@ -28,6 +27,27 @@ class TestBitcoinConfig(unittest.TestCase):
 
         self.assertEqual(result, expected_options)
 
+    def test_generate_options_cached(self):
+        first = self.config.generate_options()
+
+        with patch("builtins.open", side_effect=FileNotFoundError) as mock_file_open:
+            result = self.config.generate_options()
+
+        mock_file_open.assert_not_called()
+        self.assertEqual(result, first)
+
+    def test_generate_rpc_connection(self):
+        result = self.config.generate_rpc_connection()
+
+        self.assertEqual(
+            result,
+            {
+                "url": "http://127.0.0.1:8332/",
+                "user": "myrpcuser",
+                "password": "myrpcpassword",
+            },
+        )
+
     @patch("builtins.open", side_effect=FileNotFoundError)
     def test_generate_options_file_not_found(self, mock_file_open):
         with self.assertRaises(FileNotFoundError):
@@ -66,3 +86,65 @@ def test_generate_options_no_environment_vars():
 
     # If the exception was not raised, fail the test
     assert False, "Expected BitcoinConfigException, but it was not raised"
+
+
+def test_generate_options_inline_comments(tmp_path):
+    conf_path = tmp_path / "bitcoin.conf"
+    conf_path.write_text(
+        "# comment line\n"
+        "RPCUser = myrpcuser # trailing comment\n"
+        "rpcpassword=myrpcpassword\n"
+        "rpcport=\n"
+        "server\n",
+        encoding="utf-8",
+    )
+
+    options = BitcoinConfig(conf_path).generate_options()
+
+    assert options == ["-rpcuser=myrpcuser", "-rpcpassword=myrpcpassword"]
+
+
+def test_generate_rpc_connection_cookie(tmp_path):
+    conf_path = tmp_path / "bitcoin.conf"
+    conf_path.write_text(
+        f"datadir={tmp_path}\nrpcconnect=10.0.0.2\nrpcport=18332\n", encoding="utf-8"
+    )
+    (tmp_path / ".cookie").write_text("__cookie__:secret", encoding="utf-8")
+
+    result = BitcoinConfig(conf_path).generate_rpc_connection()
+
+    assert result == {
+        "url": "http://10.0.0.2:18332/",
+        "user": "__cookie__",
+        "password": "secret",
+    }
+
+
+def test_generate_rpc_connection_no_credentials(tmp_path):
+    conf_path = tmp_path / "bitcoin.conf"
+    conf_path.write_text(f"datadir={tmp_path}\n", encoding="utf-8")
+
+    with pytest.raises(BitcoinConfigException):
+        BitcoinConfig(conf_path).generate_rpc_connection()
+
+
+def test_max_connections(monkeypatch):
+    config = BitcoinConfig("tests/example.conf")
+
+    monkeypatch.delenv("rpc_pool_size", raising=False)
+    assert config.max_connections == BitcoinConfig.default_max_connections
+
+    monkeypatch.setenv("rpc_pool_size", "16")
+    assert config.max_connections == 16
+    assert config.generate_rpc_connection()["url"] == "http://127.0.0.1:8332/"
+
+
+@pytest.mark.parametrize("pool_size", ["0", "-1", "eight"])
+def test_max_connections_invalid(monkeypatch, pool_size):
+    monkeypatch.setenv("rpc_pool_size", pool_size)
+    config = BitcoinConfig("tests/example.conf")
+
+    # building the connection settings doesn't depend on the pool size
+    config.generate_rpc_connection()
+    with pytest.raises(BitcoinConfigException, match="rpc_pool_size"):
+        config.max_connections
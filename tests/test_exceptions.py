@@ -1,8 +1,10 @@
-import sys
-from os import path
-
-sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
-from src.exceptions import BitcoinConfigException, DailyPriceException, RPCException
+from src.exceptions import (
+    BitcoinConfigException,
+    DailyPriceException,
+    RPCCoolOffException,
+    RPCException,
+    RPCNodeException,
+)
 
 
 def test_bitcoin_config_exception():
@@ -24,3 +26,18 @@ def test_rpc_exception():
         raise RPCException("RPC call failed")
     except RPCException as e:
         assert str(e) == "RPC call failed"
+
+
+def test_rpc_cool_off_exception():
+    try:
+        raise RPCCoolOffException("RPC call skipped")
+    except RPCException as e:
+        assert str(e) == "RPC call skipped"
+
+
+def test_rpc_node_exception():
+    try:
+        raise RPCNodeException("Block not found", -5)
+    except RPCException as e:
+        assert str(e) == "Block not found"
+        assert e.code == -5
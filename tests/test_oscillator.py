@@ -0,0 +1,142 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import orjson
+from pytest import fixture, mark
+
+from src.oscillator import BlockOscillator, _recent_anchors
+
+PRICE_DAY_TIMESTAMP = 1690848000
+
+
+@fixture(autouse=True)
+def day_blocks_path(tmp_path, monkeypatch):
+    # Keep saved price day blocks out of the home directory
+    path = tmp_path / "day_blocks.json"
+    monkeypatch.setattr(BlockOscillator, "day_blocks_path", path)
+    return path
+
+
+def mock_rpc(block_times: list) -> MagicMock:
+    # Mock an RPC client with block_times
+    rpc = MagicMock()
+    rpc.get_block_hash = AsyncMock(return_value="genesis")
+    rpc.get_block_time = AsyncMock(side_effect=lambda height: block_times[height])
+    return rpc
+
+
+def oscillator(block_times: list) -> BlockOscillator:
+    _recent_anchors.clear()
+    return BlockOscillator(
+        mock_rpc(block_times),
+        {
+            "price_day_timestamp": PRICE_DAY_TIMESTAMP,
+            "latest_block_timestamp": block_times[-1],
+            "block_count": len(block_times) - 1,
+        },
+    )
+
+
+@mark.asyncio
+async def test_block_oscillator_finds_first_block_of_day():
+    # 10 minute blocks starting 3 days and 5 seconds before the price day
+    block_times = [PRICE_DAY_TIMESTAMP - 3 * 86400 - 5 + 600 * h for h in range(1000)]
+
+    assert await oscillator(block_times).run_block_oscillator() == 433
+
+
+@mark.asyncio
+async def test_block_oscillator_slow_blocks():
+    # 15 minute blocks, so the first estimate is far from the price day
+    block_times = [PRICE_DAY_TIMESTAMP - 2 * 86400 + 900 * h for h in range(500)]
+
+    block = await oscillator(block_times).run_block_oscillator()
+
+    assert block == 192
+    assert block_times[block - 1] < PRICE_DAY_TIMESTAMP <= block_times[block]
+
+
+def test_block_estimate():
+    block_oscillator = oscillator([PRICE_DAY_TIMESTAMP])
+
+    assert block_oscillator._block_estimate(86400) == 144
+    assert block_oscillator._block_estimate(899) == 1
+    assert block_oscillator._block_estimate(-899) == -1
+    assert block_oscillator._block_estimate(299) == 0
+
+
+@mark.asyncio
+async def test_block_oscillator_anchors():
+    block_times = [PRICE_DAY_TIMESTAMP - 30 * 86400 - 5 + 600 * h for h in range(6000)]
+    await oscillator(block_times).run_block_oscillator()
+
+    # the next day is estimated from the anchor left by the price day
+    next_day = BlockOscillator(
+        mock_rpc(block_times),
+        {
+            "price_day_timestamp": PRICE_DAY_TIMESTAMP + 86400,
+            "latest_block_timestamp": block_times[-1],
+            "block_count": len(block_times) - 1,
+        },
+    )
+
+    assert _recent_anchors == {PRICE_DAY_TIMESTAMP: 4321}
+    assert next_day._anchored_block_estimate() == 4321 + 144
+    assert await next_day.run_block_oscillator() == 4465
+
+
+@mark.asyncio
+async def test_block_oscillator_day_blocks(day_blocks_path):
+    block_times = [PRICE_DAY_TIMESTAMP - 3 * 86400 - 5 + 600 * h for h in range(1000)]
+    assert await oscillator(block_times).run_block_oscillator() == 433
+
+    # a later run only checks the times of the saved block and the one before
+    block_oscillator = oscillator(block_times)
+    assert await block_oscillator.run_block_oscillator() == 433
+    assert block_oscillator.rpc.get_block_time.await_count == 2
+    assert (
+        day_blocks_path.read_text() == f'{{"genesis":{{"{PRICE_DAY_TIMESTAMP}":433}}}}'
+    )
+
+
+@mark.asyncio
+async def test_block_oscillator_day_blocks_other_chain(day_blocks_path):
+    block_times = [PRICE_DAY_TIMESTAMP - 3 * 86400 - 5 + 600 * h for h in range(1000)]
+    day_blocks_path.write_text(f'{{"other":{{"{PRICE_DAY_TIMESTAMP}":500}}}}')
+
+    assert await oscillator(block_times).run_block_oscillator() == 433
+    assert orjson.loads(day_blocks_path.read_bytes()) == {
+        "other": {str(PRICE_DAY_TIMESTAMP): 500},
+        "genesis": {str(PRICE_DAY_TIMESTAMP): 433},
+    }
+
+
+@mark.asyncio
+async def test_block_oscillator_day_blocks_wrong_block(day_blocks_path):
+    block_times = [PRICE_DAY_TIMESTAMP - 3 * 86400 - 5 + 600 * h for h in range(1000)]
+    day_blocks_path.write_text(f'{{"genesis":{{"{PRICE_DAY_TIMESTAMP}":432}}}}')
+
+    # the saved block is before the price day, so the block is searched for
+    assert await oscillator(block_times).run_block_oscillator() == 433
+    assert orjson.loads(day_blocks_path.read_bytes()) == {
+        "genesis": {str(PRICE_DAY_TIMESTAMP): 433}
+    }
+
+
+@mark.asyncio
+@mark.parametrize("payload", ["[433]", "433", '{"genesis":[433]}', "{"])
+async def test_block_oscillator_day_blocks_malformed(day_blocks_path, payload):
+    block_times = [PRICE_DAY_TIMESTAMP - 3 * 86400 - 5 + 600 * h for h in range(1000)]
+    day_blocks_path.write_text(payload)
+
+    assert await oscillator(block_times).run_block_oscillator() == 433
+    assert orjson.loads(day_blocks_path.read_bytes()) == {
+        "genesis": {str(PRICE_DAY_TIMESTAMP): 433}
+    }
+
+
+@mark.asyncio
+async def test_block_oscillator_day_blocks_not_buried(day_blocks_path):
+    block_times = [PRICE_DAY_TIMESTAMP - 3 * 86400 - 5 + 600 * h for h in range(436)]
+
+    assert await oscillator(block_times).run_block_oscillator() == 433
+    assert not day_blocks_path.exists()
@@ -1,17 +1,31 @@
-import sys
-from os import path
-from typing import List
-from unittest.mock import MagicMock, patch
+import gc
+from asyncio import get_running_loop
+from itertools import cycle
+from typing import Dict, List
+from unittest.mock import AsyncMock, MagicMock, patch
 
-from pytest import mark
+from aiohttp import ClientError
+from pytest import fixture, mark, raises
 
-sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
+from src.blocks import Block, BlockHeader
 from src.config import BitcoinConfig
-from src.exceptions import RPCException
-from src.rpc import BitcoinRPCClient
+from src.exceptions import RPCCoolOffException, RPCException, RPCNodeException
+from src.rpc import BitcoinRPCClient, _shared_clients
+
+RPC_CONNECTION = {
+    "url": "http://127.0.0.1:8332/",
+    "user": "myrpcuser",
+    "password": "myrpcpassword",
+}
 
 
 class MockBitcoinConfig:
+    max_connections: int = 8
+    keepalive_timeout: int = 300
+    rpc_timeout: int = 300
+    rpc_batch: bool = True
+    rpc_batch_size: int = 100
+
     def __init__(self, conf_path: str = None):
         # Mock the initialization behavior
         self.conf_path = conf_path
@@ -22,65 +36,390 @@ class MockBitcoinConfig:
         # Mock the generation of RPC-related options
         return ["mock_option1", "mock_option2"]
 
+    def generate_rpc_connection(self) -> Dict[str, str]:
+        # Mock the RPC connection settings
+        return RPC_CONNECTION
+
+
+def mock_session(response_bytes: bytes, status: int = 200) -> MagicMock:
+    # Mock a ClientSession whose post returns response_bytes
+    response = MagicMock(status=status)
+    response.read = AsyncMock(return_value=response_bytes)
+    session = MagicMock()
+    session.post.return_value.__aenter__.return_value = response
+    return session
+
+
+def mock_bitcoin_config() -> MagicMock:
+    # Mock a BitcoinConfig with the settings read by BitcoinRPCClient
+    mock_config = MagicMock(spec=BitcoinConfig)
+    mock_config.generate_rpc_connection.return_value = RPC_CONNECTION
+    mock_config.max_connections = MockBitcoinConfig.max_connections
+    mock_config.keepalive_timeout = MockBitcoinConfig.keepalive_timeout
+    mock_config.rpc_timeout = MockBitcoinConfig.rpc_timeout
+    return mock_config
+
+
+@fixture
+def rpc() -> BitcoinRPCClient:
+    # A fresh client per test, so no cached hashes or times carry over
+    return BitcoinRPCClient(MockBitcoinConfig())
+
 
 class TestRPCCalls:
-    rpc: BitcoinRPCClient = BitcoinRPCClient(MockBitcoinConfig())
+    @mark.asyncio
+    async def test__get_rpc_response(self, rpc):
+        rpc._session = mock_session(b'{"result": 1234, "error": null, "id": 0}')
+
+        result = await rpc._get_rpc_response("getblockhash", 1234)
+
+        assert result == 1234
+        _, kwargs = rpc._session.post.call_args
+        assert kwargs["json"]["method"] == "getblockhash"
+        assert kwargs["json"]["params"] == [1234]
 
     @mark.asyncio
-    @patch("src.rpc.BitcoinRPCClient._get_rpc_response", return_value=b"1234")
-    async def test_get_block_count(self, mock_get_rpc_response):
-        block_count = await self.rpc.get_block_count()
-        assert block_count == 1234
+    @mark.parametrize(
+        "method, args, rpc_call, rpc_result",
+        [
+            ("get_block_count", (), ("getblockcount",), 1234),
+            (
+                "get_block_hash",
+                (600000,),
+                ("getblockhash", 600000),
+                "00000000000nevergoingtogiveyouup",
+            ),
+        ],
+    )
+    async def test_rpc_method(self, rpc, method, args, rpc_call, rpc_result):
+        with patch.object(
+            BitcoinRPCClient, "_get_rpc_response", return_value=rpc_result
+        ) as mock_get_rpc_response:
+            result = await getattr(rpc, method)(*args)
+
+        assert result == rpc_result
+        mock_get_rpc_response.assert_awaited_once_with(*rpc_call)
 
     @mark.asyncio
     @patch(
         "src.rpc.BitcoinRPCClient._get_rpc_response",
-        return_value=b"00000000000nevergoingtogiveyouup",
+        return_value="00000000000000000001" + "ab" * 22,
     )
-    async def test_get_block_hash(self, mock_get_rpc_response):
-        result = await self.rpc.get_block_hash(600000)
-        assert result == "00000000000nevergoingtogiveyouup"
+    async def test_get_block_hash_bytes(self, mock_get_rpc_response, rpc):
+        result = await rpc.get_block_hash_bytes(600000)
+
+        assert len(result) == 32
+        assert result == b"\xab" * 22 + b"\x01" + b"\x00" * 9
+
+    @mark.asyncio
+    @patch("asyncio.sleep", new_callable=AsyncMock)
+    async def test__get_rpc_response_retry(self, mock_sleep, rpc):
+        rpc._session = mock_session(b'{"result": 1234, "error": null, "id": 0}')
+        response = rpc._session.post.return_value.__aenter__.return_value
+        response.read.side_effect = [
+            ClientError("connection reset"),
+            b'{"result": 1234, "error": null, "id": 0}',
+        ]
+
+        result = await rpc._get_rpc_response("getblockcount")
+
+        assert result == 1234
+        assert rpc._session.post.call_count == 2
+        mock_sleep.assert_awaited_once()
+
+    @mark.asyncio
+    @patch("asyncio.sleep", new_callable=AsyncMock)
+    async def test__get_rpc_response_error(self, mock_sleep, rpc):
+        rpc._session = mock_session(
+            b'{"result": null, "error": {"code": -8, "message": "out of range"},'
+            b' "id": 0}'
+        )
+
+        with raises(RPCNodeException, match="out of range") as error:
+            await rpc._get_rpc_response("getblockhash", -1)
+        assert error.value.code == -8
+        assert rpc._session.post.call_count == 1
+        mock_sleep.assert_not_awaited()
+
+        # the node answered, so calls aren't cooled off
+        with raises(RPCNodeException, match="out of range"):
+            await rpc._get_rpc_response("getblockhash", -1)
+        assert rpc._session.post.call_count == 2
+
+    @mark.asyncio
+    @patch("asyncio.sleep", new_callable=AsyncMock)
+    async def test__get_rpc_response_warmup(self, mock_sleep, rpc):
+        rpc._session = mock_session(b"")
+        response = rpc._session.post.return_value.__aenter__.return_value
+        response.read.side_effect = [
+            b'{"result": null, "error": {"code": -28, "message": "Loading block'
+            b' index..."}, "id": 0}',
+            b'{"result": 1234, "error": null, "id": 0}',
+        ]
+
+        assert await rpc._get_rpc_response("getblockcount") == 1234
+        assert rpc._session.post.call_count == 2
+
+    @mark.asyncio
+    @patch("asyncio.sleep", new_callable=AsyncMock)
+    async def test__get_rpc_batch_node_error(self, mock_sleep, rpc):
+        rpc._session = mock_session(
+            b'[{"result": "a", "error": null, "id": 1},'
+            b' {"result": null, "error": {"code": -8, "message": "out of range"},'
+            b' "id": 2}]'
+        )
+        rpc._request_ids = iter([1, 2])
+
+        with raises(RPCNodeException, match="out of range"):
+            await rpc._get_rpc_batch([("getblockhash", [1]), ("getblockhash", [-1])])
+        assert rpc._session.post.call_count == 1
+
+    @mark.asyncio
+    @patch("asyncio.sleep", new_callable=AsyncMock)
+    async def test_rpc_cool_off(self, mock_sleep, rpc):
+        rpc._session = mock_session(b"")
+        response = rpc._session.post.return_value.__aenter__.return_value
+        response.read.side_effect = ClientError("connection refused")
+
+        with raises(RPCException, match="connection refused"):
+            await rpc._get_rpc_response("getblockcount")
+        assert rpc._session.post.call_count == 5
+
+        # later calls fail fast without retrying against the node
+        with raises(RPCCoolOffException):
+            await rpc._get_rpc_response("getblockcount")
+        with raises(RPCCoolOffException):
+            await rpc._get_rpc_batch([("getblockhash", [1])])
+        assert rpc._session.post.call_count == 5
+
+        rpc._cool_off_until = 0.0
+        response.read.side_effect = None
+        response.read.return_value = b'{"result": 1234, "error": null, "id": 0}'
+        assert await rpc._get_rpc_response("getblockcount") == 1234
+
+    @mark.asyncio
+    @patch("asyncio.sleep", new_callable=AsyncMock)
+    async def test__get_rpc_batch_error(self, mock_sleep, rpc):
+        rpc._session = mock_session(b"Work queue depth exceeded", status=503)
+
+        with raises(RPCException, match="503"):
+            await rpc._get_rpc_batch([("getblockhash", [1])])
+        assert rpc._session.post.call_count == 5
+
+    @mark.asyncio
+    @patch("asyncio.sleep", new_callable=AsyncMock)
+    async def test__get_rpc_batch_missing_result(self, mock_sleep, rpc):
+        rpc._session = mock_session(b'[{"result": "a", "error": null, "id": 1}]')
+        rpc._request_ids = cycle([1, 2])
+
+        with raises(RPCException, match=r"no result for getblockhash \[2\]"):
+            await rpc._get_rpc_batch([("getblockhash", [1]), ("getblockhash", [2])])
+        assert rpc._session.post.call_count == 5
+
+    @mark.asyncio
+    async def test__get_rpc_batch(self, rpc):
+        rpc._session = mock_session(
+            b'[{"result": "b", "error": null, "id": 2},'
+            b' {"result": "a", "error": null, "id": 1}]'
+        )
+        rpc._request_ids = iter([1, 2])
+
+        result = await rpc._get_rpc_batch(
+            [("getblockhash", [1]), ("getblockhash", [2])]
+        )
+
+        assert result == ["a", "b"]
+        _, kwargs = rpc._session.post.call_args
+        assert [call["params"] for call in kwargs["json"]] == [[1], [2]]
 
     @mark.asyncio
     @patch(
-        "src.rpc.BitcoinRPCClient._get_rpc_response",
-        return_value=b"00000000000nevergoingtoletyoudown",
+        "src.rpc.BitcoinRPCClient._get_rpc_batch",
+        return_value=["00000000000nevergoingtoletyoudown"] * 2,
     )
-    async def test_get_block_hashes(self, mock_get_rpc_response):
-        result = await self.rpc.get_block_hashes([1, 2])
+    async def test_get_block_hashes(self, mock_get_rpc_batch, rpc):
+        result = await rpc.get_block_hashes([1, 2])
         assert result == ["00000000000nevergoingtoletyoudown"] * 2
+        mock_get_rpc_batch.assert_called_once_with(
+            [("getblockhash", [1]), ("getblockhash", [2])]
+        )
 
     @mark.asyncio
-    @patch(
-        "src.rpc.BitcoinRPCClient._get_rpc_response", return_value=b'{"block": 90210}'
-    )
-    async def test_get_block_header(self, mock_get_rpc_response):
-        result = await self.rpc.get_block_header("hash")
-        assert result["block"] == 90210
+    @patch("src.rpc.BitcoinRPCClient._get_rpc_batch")
+    async def test_get_block_hashes_batch_size(self, mock_get_rpc_batch, rpc):
+        mock_get_rpc_batch.side_effect = lambda calls: [
+            f"hash{params[0]}" for _, params in calls
+        ]
+        rpc.conf.rpc_batch_size = 2
+
+        result = await rpc.get_block_hashes(range(5))
+
+        assert result == [f"hash{height}" for height in range(5)]
+        assert [len(call.args[0]) for call in mock_get_rpc_batch.call_args_list] == [
+            2,
+            2,
+            1,
+        ]
 
     @mark.asyncio
-    @patch(
-        "src.rpc.BitcoinRPCClient._get_rpc_response",
-        return_value=b'{"hash": "nevergoingtorunaround"}',
-    )
-    async def test_get_block(self, mock_get_rpc_response):
-        result = await self.rpc.get_block("hash")
-        assert result["hash"] == "nevergoingtorunaround"
+    @patch("src.rpc.BitcoinRPCClient._get_rpc_response", side_effect=["a", "b"])
+    async def test_get_block_hashes_no_batch(self, mock_get_rpc_response, rpc):
+        rpc.conf.rpc_batch = False
+
+        result = await rpc.get_block_hashes([1, 2])
+
+        assert result == ["a", "b"]
+        mock_get_rpc_response.assert_any_call("getblockhash", 1)
+        mock_get_rpc_response.assert_any_call("getblockhash", 2)
 
     @mark.asyncio
-    @patch(
-        "src.rpc.BitcoinRPCClient._get_rpc_response",
-        return_value=b'{"hash": "anddesertyou"}',
-    )
-    async def test_get_blocks(self, mock_get_rpc_response):
-        result = await self.rpc.get_blocks(["hash", "hash"])
-        assert [r["hash"] for r in result] == ["anddesertyou"] * 2
+    @patch("src.rpc.BitcoinRPCClient.get_block_hashes")
+    async def test_iter_block_hashes(self, mock_get_block_hashes, rpc):
+        mock_get_block_hashes.side_effect = lambda heights: [
+            f"hash{height}" for height in heights
+        ]
+        rpc.hash_chunk_size = 2
+
+        result = [pair async for pair in rpc.iter_block_hashes(range(5))]
+
+        assert result == [(height, f"hash{height}") for height in range(5)]
+        assert [call.args for call in mock_get_block_hashes.call_args_list] == [
+            ([0, 1],),
+            ([2, 3],),
+            ([4],),
+        ]
+
+    @mark.asyncio
+    @patch("src.rpc.BitcoinRPCClient._get_rpc_response")
+    async def test_get_block_hash_cache(self, mock_get_rpc_response, rpc):
+        mock_get_rpc_response.side_effect = [1000, "buried", "tip", "tip"]
+
+        await rpc.get_block_count()
+        assert await rpc.get_block_hash(994) == "buried"
+        assert await rpc.get_block_hash(994) == "buried"
+        assert await rpc.get_block_hash(995) == "tip"
+        assert await rpc.get_block_hash(995) == "tip"
+
+        # only the block 6 deep is cached
+        assert mock_get_rpc_response.call_count == 4
+
+    @mark.asyncio
+    @patch("src.rpc.BitcoinRPCClient._get_rpc_response")
+    async def test_get_block_hash_cache_size(self, mock_get_rpc_response, rpc):
+        rpc._block_hashes.maxsize = 2
+        mock_get_rpc_response.side_effect = [1000, "a", "b", "c", "b"]
+
+        await rpc.get_block_count()
+        for height in (1, 2, 1, 3, 2):
+            await rpc.get_block_hash(height)
+
+        # 1 was used more recently than 2, so 2 was dropped for 3
+        assert list(rpc._block_hashes) == [3, 2]
+        assert mock_get_rpc_response.call_count == 5
+
+    @mark.asyncio
+    @patch("src.rpc.BitcoinRPCClient._get_rpc_response")
+    async def test_get_block_time(self, mock_get_rpc_response, rpc):
+        mock_get_rpc_response.side_effect = [1000, {"time": 1234}, {"time": 5678}]
+
+        await rpc.get_block_count()
+        assert await rpc.get_block_time(994) == 1234
+        assert await rpc.get_block_time(994) == 1234
+        assert await rpc.get_block_time(1000) == 5678
+
+        mock_get_rpc_response.assert_any_call("getblockstats", 994, ["time"])
+        assert mock_get_rpc_response.call_count == 3
+
+    @mark.asyncio
+    async def test_get_block_header(self, rpc):
+        rpc._session = mock_session(
+            b'{"result": {"hash": "nevergoingtorunaround", "confirmations": 7,'
+            b' "height": 90210, "version": 2, "versionHex": "00000002",'
+            b' "merkleroot": "merkleroot", "time": 1290000000,'
+            b' "mediantime": 1289999000, "nonce": 1, "bits": "1b00dc31",'
+            b' "difficulty": 15.5, "chainwork": "00", "nTx": 3,'
+            b' "previousblockhash": "previous"}, "error": null, "id": 0}'
+        )
+
+        result = await rpc.get_block_header("hash")
+
+        assert isinstance(result, BlockHeader)
+        assert result.height == 90210
+        assert result.n_tx == 3
+        assert result.previousblockhash == "previous"
+        assert result.nextblockhash is None
+
+    @mark.asyncio
+    async def test_get_block(self, rpc):
+        rpc._session = mock_session(
+            b'{"result": {"hash": "nevergoingtorunaround", "height": 90210,'
+            b' "time": 1290000000, "size": 1000, "tx": [{"txid": "txid",'
+            b' "vin": [{"coinbase": "04"}], "vout": [{"value": 50.0, "n": 0,'
+            b' "scriptPubKey": {"hex": "41"}}, {"value": 0.001, "n": 1}]}]},'
+            b' "error": null, "id": 0}'
+        )
+
+        result = await rpc.get_block("hash")
+
+        # fields not in Block, like vin and scriptPubKey, are skipped
+        assert isinstance(result, Block)
+        assert result.height == 90210
+        assert [output.value for output in result.tx[0].vout] == [50.0, 0.001]
+        _, kwargs = rpc._session.post.call_args
+        assert kwargs["json"]["params"] == ["hash", 2]
+
+    @mark.asyncio
+    @patch("src.rpc.BitcoinRPCClient._get_rpc_batch")
+    @patch("src.rpc.BitcoinRPCClient.get_block")
+    async def test_get_blocks(self, mock_get_block, mock_get_rpc_batch, rpc):
+        mock_get_block.side_effect = lambda block_hash: Block(
+            hash=block_hash, height=1, time=2, tx=[]
+        )
+
+        result = await rpc.get_blocks(["anddesertyou", "andhurtyou"])
+
+        # blocks are never batched
+        assert [r.hash for r in result] == ["anddesertyou", "andhurtyou"]
+        mock_get_rpc_batch.assert_not_called()
+
+    @mark.asyncio
+    @patch("src.rpc.BitcoinRPCClient.get_block")
+    async def test_iter_blocks(self, mock_get_block, rpc):
+        mock_get_block.side_effect = lambda block_hash: {"hash": block_hash}
+        block_hashes = [f"hash{i}" for i in range(20)]
+
+        result = [block async for block in rpc.iter_blocks(block_hashes)]
+
+        assert sorted(r["hash"] for r in result) == sorted(block_hashes)
+
+    @mark.asyncio
+    @patch("src.rpc.BitcoinRPCClient.get_block")
+    async def test_iter_blocks_errors(self, mock_get_block, rpc):
+        def get_block(block_hash):
+            if block_hash in ("hash1", "hash2"):
+                raise RPCNodeException(f"{block_hash} not found", -5)
+            return {"hash": block_hash}
+
+        mock_get_block.side_effect = get_block
+        contexts = []
+        get_running_loop().set_exception_handler(
+            lambda loop, context: contexts.append(context)
+        )
+
+        result = []
+        with raises(RPCNodeException, match="not found"):
+            async for block in rpc.iter_blocks([f"hash{i}" for i in range(4)]):
+                result.append(block)
+        gc.collect()
+
+        # blocks finished with the failures are yielded, and both failures
+        # are retrieved instead of logged as never retrieved
+        assert sorted(r["hash"] for r in result) == ["hash0", "hash3"]
+        assert not contexts
 
     @mark.asyncio
     async def test_rpc_client_async_context(self):
-        # Create a mock BitcoinConfig instance
-        mock_config = MagicMock(spec=BitcoinConfig)
-        mock_config.generate_options.return_value = []
+        mock_config = mock_bitcoin_config()
 
         # Create a mock RPC exception
         mock_exception = RPCException("RPC call failed...")
@@ -101,10 +440,76 @@ class TestRPCCalls:
 
     @mark.asyncio
     async def test_rpc_client_async_context_noop(self):
-        # Create a mock BitcoinConfig instance
-        mock_config = MagicMock(spec=BitcoinConfig)
-        mock_config.generate_options.return_value = []
+        mock_config = mock_bitcoin_config()
 
         async with BitcoinRPCClient(mock_config) as client:
             # Test __aexit__ method with no exception
             await client.__aexit__(None, None, None)
+
+    @mark.asyncio
+    async def test_rpc_client_session(self, rpc):
+        async with rpc:
+            session = rpc._session
+            assert session.auth.login == "myrpcuser"
+            assert session.auth.password == "myrpcpassword"
+            assert session.connector.limit == MockBitcoinConfig.max_connections
+            assert session.json_serialize({"params": [1]}) == '{"params":[1]}'
+            assert not session.closed
+
+        assert session.closed
+        assert rpc._session is None
+
+    @mark.asyncio
+    async def test_rpc_client_shared(self):
+        _shared_clients.clear()
+        client = BitcoinRPCClient.shared(MockBitcoinConfig())
+
+        assert BitcoinRPCClient.shared(MockBitcoinConfig()) is client
+        assert BitcoinRPCClient(MockBitcoinConfig()) is not client
+
+        async with client:
+            session = client._session
+            async with BitcoinRPCClient.shared(MockBitcoinConfig()) as other:
+                assert other._session is session
+
+            # still open for the outer context
+            assert not session.closed
+
+        assert session.closed
+        assert client._session is None
+
+        # closed clients aren't shared anymore
+        assert not _shared_clients
+        assert BitcoinRPCClient.shared(MockBitcoinConfig()) is not client
+        _shared_clients.clear()
+
+    def test_rpc_client_shared_key(self):
+        _shared_clients.clear()
+        client = BitcoinRPCClient.shared(MockBitcoinConfig())
+
+        config = MockBitcoinConfig()
+        config.rpc_batch = False
+        assert BitcoinRPCClient.shared(config) is not client
+
+        # settings BitcoinRPCClient doesn't read don't split clients
+        config = MockBitcoinConfig()
+        config.max_concurrency = 2
+        assert BitcoinRPCClient.shared(config) is client
+
+        (key,) = [key for key, shared in _shared_clients.items() if shared is client]
+        assert RPC_CONNECTION["password"] not in key
+        _shared_clients.clear()
+
+    def test_rpc_client_shared_connection(self):
+        _shared_clients.clear()
+        config = MockBitcoinConfig()
+
+        with patch.object(
+            config, "generate_rpc_connection", return_value=RPC_CONNECTION
+        ) as mock_generate_rpc_connection:
+            client = BitcoinRPCClient.shared(config)
+
+        # the cookie file is only read once
+        mock_generate_rpc_connection.assert_called_once_with()
+        assert client.rpc_connection == RPC_CONNECTION
+        _shared_clients.clear()
@@ -0,0 +1,155 @@
+from asyncio import sleep
+from datetime import date, datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import numpy as np
+from pytest import fixture, mark, raises
+
+from run import estimate_prices, main, parse_date
+from src.bins import PriceBins
+from src.blocks import Block, Transaction, TxOut
+from src.daily_price import BitcoinDailyPrice
+from src.oscillator import BlockOscillator, _recent_anchors
+
+# 10 minute blocks starting 3 days before 2023-08-01, so block 432 is the
+# first block of 2023-08-01 and block 576 the first block of 2023-08-02
+FIRST_BLOCK_TIMESTAMP = 1690848000 - 3 * 86400
+DAY_PRICES = {"2023-08-01": 30000, "2023-08-02": 40000}
+
+
+@fixture(autouse=True)
+def day_blocks_path(tmp_path, monkeypatch):
+    # Keep saved price day blocks out of the home directory
+    _recent_anchors.clear()
+    monkeypatch.setattr(BlockOscillator, "day_blocks_path", tmp_path / "blocks.json")
+
+
+def block_time(height: int) -> int:
+    return FIRST_BLOCK_TIMESTAMP + 600 * height
+
+
+def block(height: int) -> Block:
+    # Round USD amounts paid at the price of the block's day
+    day = datetime.fromtimestamp(block_time(height), timezone.utc).date().isoformat()
+    price = DAY_PRICES.get(day, 25000)
+    amounts = np.random.default_rng(height).choice([5, 10, 20, 50, 100], 40)
+    return Block(
+        hash=f"{height:064x}",
+        height=height,
+        time=block_time(height),
+        tx=[Transaction(vout=[TxOut(round(usd / price, 8))]) for usd in amounts],
+    )
+
+
+def mock_rpc(block_count: int = 999) -> MagicMock:
+    # Mock an RPC client with 10 minute blocks
+    rpc = MagicMock()
+    rpc.get_block_count = AsyncMock(return_value=block_count)
+    rpc.get_block_time = AsyncMock(side_effect=block_time)
+    rpc.get_block_hash = AsyncMock(return_value="genesis")
+    rpc.get_block_hashes = AsyncMock(
+        side_effect=lambda heights: [f"{height:064x}" for height in heights]
+    )
+    rpc.streamed_heights = []
+
+    async def iter_blocks(block_hashes):
+        for block_hash in block_hashes:
+            rpc.streamed_heights.append(int(block_hash, 16))
+            yield block(int(block_hash, 16))
+
+    rpc.iter_blocks = iter_blocks
+    return rpc
+
+
+def test_parse_date():
+    assert parse_date("2023-08-01") == date(2023, 8, 1)
+
+
+@mark.parametrize(
+    "date_string", ["2023-08-01T13:00", "2023-08-01+05:00", "20230801", "08/01/2023"]
+)
+def test_parse_date_rejects_other_formats(date_string):
+    with raises(ValueError):
+        parse_date(date_string)
+
+
+@mark.asyncio
+async def test_estimate_prices():
+    rpc = mock_rpc()
+    binned = []
+    original_bin_block = PriceBins._bin_block
+
+    def bin_block(bins, block):
+        binned.append((bins.price_day_block, block.height))
+        original_bin_block(bins, block)
+
+    with patch.object(
+        BitcoinDailyPrice,
+        "add_block",
+        autospec=True,
+        side_effect=BitcoinDailyPrice.add_block,
+    ) as add_block, patch.object(PriceBins, "_bin_block", bin_block):
+        prices = await estimate_prices(rpc, list(DAY_PRICES), 2)
+
+    # the overlapping heights of both days are only requested once
+    rpc.get_block_hashes.assert_awaited_once_with(list(range(407, 751)))
+    assert rpc.streamed_heights == list(range(407, 751))
+
+    # each overlapping block is added to both days
+    added = [
+        (daily_price.bins.price_day_block, block.height)
+        for (daily_price, block), _ in add_block.call_args_list
+    ]
+    assert sorted(added) == [(432, height) for height in range(407, 607)] + [
+        (576, height) for height in range(551, 751)
+    ]
+
+    # but each day only bins the blocks of its own day
+    assert sorted(binned) == [(432, height) for height in range(432, 576)] + [
+        (576, height) for height in range(576, 720)
+    ]
+
+    # the prices are in the order of the dates
+    for price, day_price in zip(prices, DAY_PRICES.values()):
+        assert abs(price - day_price) < day_price * 0.05
+    assert await estimate_prices(mock_rpc(), list(reversed(DAY_PRICES)), 2) == (
+        prices[::-1]
+    )
+
+
+@mark.asyncio
+async def test_estimate_prices_max_concurrency():
+    running = 0
+    peak = 0
+
+    async def prepare(daily_price):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await sleep(0)
+        running -= 1
+        return []
+
+    with patch.object(BitcoinDailyPrice, "prepare", prepare), patch.object(
+        BitcoinDailyPrice, "finalize", return_value=1
+    ):
+        dates = [f"2023-08-{day:02}" for day in range(1, 8)]
+        assert await estimate_prices(mock_rpc(), dates, 3) == [1] * 7
+
+    assert peak == 3
+
+
+@mark.asyncio
+@patch("run.estimate_prices", new_callable=AsyncMock)
+@patch("run.BitcoinRPCClient")
+@patch("run.BitcoinConfig")
+async def test_main_max_concurrency(
+    mock_config, mock_client, mock_estimate_prices, monkeypatch
+):
+    mock_config.return_value.max_concurrency = 3
+    monkeypatch.setattr("sys.argv", ["run.py", "-d", "2023-08-01"])
+
+    await main()
+
+    rpc = mock_client.return_value.__aenter__.return_value
+    mock_estimate_prices.assert_awaited_once_with(rpc, ["2023-08-01"], 3)
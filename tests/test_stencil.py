@@ -0,0 +1,58 @@
+from unittest.mock import MagicMock
+
+import numpy as np
+from pytest import approx
+
+from src.bins import PriceBins
+from src.stencil import Stencil
+
+
+def price_bins(price: float) -> PriceBins:
+    # Bins with round USD amounts at price plus noise
+    rng = np.random.default_rng(4)
+    bins = PriceBins(MagicMock(), 800000, 1690848000)
+    usd = rng.choice([1, 5, 10, 20, 50, 100, 200, 500, 1000], 20000)
+    bins._bin_amounts(
+        np.concatenate(
+            [
+                usd / price * (1 + rng.normal(0, 0.003, usd.size)),
+                10 ** rng.uniform(-5, 1, 20000),
+            ]
+        )
+    )
+    bins.process_curve()
+    return bins
+
+
+def test_stencil_arrays():
+    assert dict(zip(Stencil.stencil_bins, Stencil.stencil_weights)) == approx(
+        Stencil.stencil_values
+    )
+
+
+def test_calculate_slide_scores():
+    stencil = Stencil(price_bins(30000))
+    counts = stencil.bitcoin_daily_price_values.output_bell_curve_bin_counts
+    round_usd_stencil = np.zeros(PriceBins.number_of_bins)
+    round_usd_stencil[list(Stencil.stencil_values)] = list(
+        Stencil.stencil_values.values()
+    )
+
+    slide_scores = stencil._calculate_slide_scores(-201, 201)
+
+    assert slide_scores.size == 402
+    for slide in (-201, -1, 0, 1, 200):
+        shifted_curve = counts[401 + slide : 1401 + slide]
+        assert slide_scores[slide + 201] == approx(
+            sum(
+                float(curve) * round_usd_stencil[n + 401]
+                for n, curve in enumerate(shifted_curve)
+            )
+        )
+
+
+def test_run_stencil():
+    price_estimate = Stencil(price_bins(30000)).run_stencil()
+
+    # within about a bin, bins are 1.2% apart
+    assert price_estimate == approx(30000, rel=0.02)